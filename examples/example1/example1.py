@@ -83,7 +83,7 @@ def make_model():
     Vmax, t0, m = 500, 0.1, 200
     t = sym.symbols("t")
     pulseI = Vmax * sym.atan(m * (t - t0))
-    pulse = sym.diff(pulseI, t)
+    pulse = Vmax * m / (1 + (m * (t - t0)) ** 2)  # d(pulseI)/dt
     j1pulse = Parameter.from_expression(
         "j1pulse", pulse, flux_unit, use_preintegration=True, preint_sym_expr=pulseI
     )
@@ -122,7 +122,11 @@ def make_model():
     # =============================================================================================
     # Gather all parameters, species, compartments and reactions
     # =============================================================================================
-    return sbmodel_from_locals(locals().values())
+    species = (A, B, AER, R1, R1o)
+    compartments = (Cyto, PM, ER, ERm)
+    parameters = (j1pulse, k2f, k3f, k3r, k4Vmax)
+    reactions = (r1, r2, r3, r4)
+    return sbmodel_from_locals(species + compartments + parameters + reactions)
 
 
 # We load the model generated above, and load in the mesh we will use in this example.
@@ -136,9 +140,11 @@ pc, sc, cc, rc = make_model()
 # Base mesh
 domain, facet_markers, cell_markers = common.DemoCuboidsMesh()
 # Turn off "PM" on all sides of the cube except x=0
-for face in d.faces(domain):
-    if face.midpoint().x() > d.DOLFIN_EPS and facet_markers[face] == 10:
-        facet_markers[face] = 0
+domain.init(2, 0)
+facet_vertices = domain.topology()(2, 0)().reshape(-1, 3)
+facet_midpoint_x = domain.coordinates()[facet_vertices, 0].mean(axis=1)
+facet_values = facet_markers.array()
+facet_values[(facet_midpoint_x > d.DOLFIN_EPS) & (facet_values == 10)] = 0
 # Write mesh and meshfunctions to file
 os.makedirs("mesh", exist_ok=True)
 common.write_mesh(domain, facet_markers, cell_markers, filename="mesh/DemoCuboidsMesh")
@@ -157,6 +163,14 @@ config.solver.update(
         "initial_dt": 0.01,
         "time_precision": 6,
         "use_snes": True,
+        "snes_lag_preconditioner": 20,
+        # kernels are compiled on (and for) this machine
+        "form_compiler_parameters": {
+            "representation": "uflacs",
+            "optimize": True,
+            "cpp_optimize": True,
+            "cpp_optimize_flags": "-O3 -march=native",
+        },
         "print_assembly": False,
     }
 )
@@ -165,22 +179,31 @@ model.initialize(initialize_solver=False)
 model.initialize_discrete_variational_problem_and_solver()
 
 # Write initial condition(s) to file
-results = dict()
+# All species are written as checkpoints to a single XDMF file (viewable in ParaView)
 os.makedirs("results", exist_ok=True)
-for species_name, species in model.sc.items:
-    results[species_name] = d.XDMFFile(
-        model.mpi_comm_world, f"results/{species_name}.xdmf"
-    )
-    results[species_name].parameters["flush_output"] = True
-    results[species_name].write(model.sc[species_name].u["u"], model.t)
+results = d.XDMFFile(model.mpi_comm_world, "results/results.xdmf")
+
+
+# (function name, solution function) for every species, looked up once
+write_targets = [(name, species.u["u"]) for name, species in model.sc.items]
+
+
+def write_results(t, append=True):
+    for name, u in write_targets:
+        results.write_checkpoint(u, name, t, d.XDMFFile.Encoding.HDF5, append)
+        append = True
+
+
+# the first write creates (overwrites) the file, everything after is appended
+write_results(float(model.t), append=False)
 
 # Solve
 while True:
     # Solve the system
     model.monolithic_solve()
     # Save results for post processing
-    for species_name, species in model.sc.items:
-        results[species_name].write(model.sc[species_name].u["u"], model.t)
+    write_results(float(model.t))
     # End if we've passed the final time
     if model.t >= model.final_t:
         break
+results.close()
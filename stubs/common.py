@@ -1,9 +1,11 @@
 """
 General functions: array manipulation, data i/o, etc
 """
+import math
 import os
 import time
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Callable, Dict, List, Tuple, Union
 
 import dolfin as d
@@ -38,6 +40,9 @@ rank = comm.rank
 size = comm.size
 root = 0
 
+# timezone used for the timestamps of _fancy_print()
+_timezone = timezone("US/Pacific")
+
 
 def stubs_expressions(
     dolfin_expressions: Dict[str, Callable[[Any], Any]]
@@ -63,8 +68,10 @@ def stubs_expressions(
         function with a unit and returns
         :code:`ufl.sin(x.to(unit.dimensionless).magnitude)`
     """
+    # bind v at definition time (a plain closure would make every entry call the
+    # last function in dolfin_expressions)
     return {
-        k: lambda x: v(x.to(unit.dimensionless).magnitude)
+        k: lambda x, v=v: v(x.to(unit.dimensionless).magnitude)
         for k, v in dolfin_expressions.items()
     }
 
@@ -172,6 +179,9 @@ class Stopwatch:
     ):
         self.name = name
         self.time_unit = time_unit
+        self._time_unit_factor = {"us": 1e6, "ms": 1e3, "s": 1, "min": 1 / 60}[
+            time_unit
+        ]
         self.stop_timings = []  # length = number of stops
         self.pause_timings = []  # length = number of stops (list of lists)
         self._pause_timings = []  # length = number of pauses (reset on stop)
@@ -185,25 +195,25 @@ class Stopwatch:
             self.start()
 
     def start(self):
-        self._times.append(time.time())
+        self._times.append(time.perf_counter())
         self.is_paused = False
 
     def pause(self):
         if self.is_paused:
             return
         else:
-            self._times.append(time.time())
+            self._times.append(time.perf_counter())
             self._pause_timings.append(self._times[-1] - self._times[-2])
             self.is_paused = True
             _fancy_print(
                 f"{self.name} (iter {len(self._pause_timings)}) finished "
-                "in {self.time_str(self._pause_timings[-1])} {self.time_unit}",
+                f"in {self.time_str(self._pause_timings[-1])} {self.time_unit}",
                 format_type="logred",
                 filename=self.filename,
             )
 
     def stop(self, print_result=True):
-        self._times.append(time.time())
+        self._times.append(time.perf_counter())
         if self.is_paused:
             final_time = 0
         else:
@@ -239,9 +249,33 @@ class Stopwatch:
         )
 
     def time_str(self, t):
-        return str({"us": 1e6, "ms": 1e3, "s": 1, "min": 1 / 60}[self.time_unit] * t)[
-            0:8
-        ]
+        return str(self._time_unit_factor * t)[0:8]
+
+
+# (buffer_color, text_color, filler_char, num_banners, new_lines, left_justify)
+# for each format_type of _fancy_print
+_format_type_options = {
+    "default": ("cyan", "green", "=", 0, (0, 0), False),
+    "title": ("cyan", "magenta", "=", 1, (1, 0), False),
+    "subtitle": ("cyan", "green", ".", 0, (0, 0), True),
+    "data": ("white", "white", "", 0, (0, 0), True),
+    "data_important": ("white", "red", "", 0, (0, 0), True),
+    "log": ("white", "green", "", 0, (0, 0), True),
+    "logred": ("white", "red", "", 0, (0, 0), True),
+    "log_important": ("white", "magenta", ".", 0, (0, 0), False),
+    "log_urgent": ("white", "red", ".", 0, (0, 0), False),
+    "warning": ("magenta", "red", "!", 2, (1, 1), False),
+    "timestep": ("cyan", "red", ".", 2, (1, 1), False),
+    "solverstep": ("cyan", "red", ".", 1, (1, 1), False),
+    "assembly": ("cyan", "magenta", ".", 0, (1, 0), False),
+    "assembly_sub": ("cyan", "magenta", "", 0, (0, 0), True),
+}
+
+
+@lru_cache(maxsize=256)
+def _colored_buffer(filler_char, buffer_size, buffer_color):
+    "Colored string of buffer_size filler characters (cached, they are reused a lot)"
+    return colored(filler_char * buffer_size, buffer_color)
 
 
 def _fancy_print(
@@ -257,81 +291,22 @@ def _fancy_print(
     filename=None,
 ):
     "Formatted text to stand out."
-
-    # Initialize with the default options
-    buffer_color_ = "cyan"
-    text_color_ = "green"
-    filler_char_ = "="
-    num_banners_ = 0
-    new_lines_ = [0, 0]
-    left_justify_ = False
-    # Override with format_type options
-    if format_type == "default":
-        pass
-    elif format_type == "title":
-        text_color_ = "magenta"
-        num_banners_ = 1
-        new_lines_ = [1, 0]
-    elif format_type == "subtitle":
-        text_color_ = "green"
-        filler_char_ = "."
-        left_justify_ = True
-    elif format_type == "data":
-        buffer_color_ = "white"
-        text_color_ = "white"
-        filler_char_ = ""
-        left_justify_ = True
-    elif format_type == "data_important":
-        buffer_color_ = "white"
-        text_color_ = "red"
-        filler_char_ = ""
-        left_justify_ = True
-    elif format_type == "log":
-        buffer_color_ = "white"
-        text_color_ = "green"
-        filler_char_ = ""
-        left_justify_ = True
-    elif format_type == "logred":
-        buffer_color_ = "white"
-        text_color_ = "red"
-        filler_char_ = ""
-        left_justify_ = True
-    elif format_type == "log_important":
-        buffer_color_ = "white"
-        text_color_ = "magenta"
-        filler_char_ = "."
-    elif format_type == "log_urgent":
-        buffer_color_ = "white"
-        text_color_ = "red"
-        filler_char_ = "."
-    elif format_type == "warning":
-        buffer_color_ = "magenta"
-        text_color_ = "red"
-        filler_char_ = "!"
-        num_banners_ = 2
-        new_lines_ = [1, 1]
-    elif format_type == "timestep":
-        text_color_ = "red"
-        num_banners_ = 2
-        filler_char_ = "."
-        new_lines_ = [1, 1]
-    elif format_type == "solverstep":
-        text_color_ = "red"
-        num_banners_ = 1
-        filler_char_ = "."
-        new_lines_ = [1, 1]
-    elif format_type == "assembly":
-        text_color_ = "magenta"
-        num_banners_ = 0
-        filler_char_ = "."
-        new_lines_ = [1, 0]
-    elif format_type == "assembly_sub":
-        text_color_ = "magenta"
-        num_banners_ = 0
-        filler_char_ = ""
-        new_lines_ = [0, 0]
-        left_justify_ = True
-    elif format_type is not None:
+    if rank != root and not gset["print_on_all_ranks"]:
+        return
+
+    # Look up the options for this format_type
+    if format_type is None:
+        format_type = "default"
+    try:
+        (
+            buffer_color_,
+            text_color_,
+            filler_char_,
+            num_banners_,
+            new_lines_,
+            left_justify_,
+        ) = _format_type_options[format_type]
+    except KeyError:
         raise ValueError("Unknown formatting_type.")
 
     # Override again with user options
@@ -352,9 +327,7 @@ def _fancy_print(
     if size > 1:
         title_text = f"CPU {rank}: {title_text}"
     if include_timestamp:
-        timestamp = datetime.now(timezone("US/Pacific")).strftime(
-            "[%Y-%m-%d time=%H:%M:%S]"
-        )
+        timestamp = datetime.now(_timezone).strftime("[%Y-%m-%d time=%H:%M:%S]")
         title_text = f"{timestamp} {title_text}"
 
     # calculate optimal buffer size
@@ -368,7 +341,7 @@ def _fancy_print(
 
     # color/stylize buffer, text, and banner
     def buffer(buffer_size):
-        return colored(filler_char * buffer_size, buffer_color)
+        return _colored_buffer(filler_char, buffer_size, buffer_color)
 
     if left_justify:
         title_str = (
@@ -379,7 +352,7 @@ def _fancy_print(
             f"{buffer(buffer_size)} {colored(title_text, text_color)} "
             f"{buffer(buffer_size+parity)}"
         )
-    banner = colored(filler_char * (title_str_len + parity), buffer_color)
+    banner = _colored_buffer(filler_char, title_str_len + parity, buffer_color)
 
     def print_out(text, filename=None):
         "print to file and terminal"
@@ -427,11 +400,16 @@ def facet_topology(f: d.Facet, mf3: d.MeshFunction):
 
 
 def cube_condition(cell, xmin=0.3, xmax=0.7):
-    return (
-        (xmin - d.DOLFIN_EPS < cell.midpoint().x() < xmax + d.DOLFIN_EPS)
-        and (xmin - d.DOLFIN_EPS < cell.midpoint().y() < xmax + d.DOLFIN_EPS)
-        and (xmin - d.DOLFIN_EPS < cell.midpoint().z() < xmax + d.DOLFIN_EPS)
-    )
+    """Check if a cell lies inside the cube [xmin, xmax]^3.
+    `cell` can also be an array of cell midpoints (shape (num_cells, 3)),
+    in which case a boolean array is returned"""
+    if isinstance(cell, d.Cell):
+        return (
+            (xmin - d.DOLFIN_EPS < cell.midpoint().x() < xmax + d.DOLFIN_EPS)
+            and (xmin - d.DOLFIN_EPS < cell.midpoint().y() < xmax + d.DOLFIN_EPS)
+            and (xmin - d.DOLFIN_EPS < cell.midpoint().z() < xmax + d.DOLFIN_EPS)
+        )
+    return np.all((xmin - d.DOLFIN_EPS < cell) & (cell < xmax + d.DOLFIN_EPS), axis=1)
 
 
 def DemoCuboidsMesh(N=16, condition=cube_condition):
@@ -440,7 +418,9 @@ def DemoCuboidsMesh(N=16, condition=cube_condition):
     two distinct cuboid subvolumes with a shared interface surface.
     Cell markers:
     1 - Default subvolume
-    2 - Subvolume specified by condition function
+    2 - Subvolume specified by condition function (evaluated on an array
+        of all cell midpoints if it supports that, see cube_condition,
+        otherwise on each d.Cell)
 
     Facet markers:
     12 - Interface between subvolumes
@@ -454,19 +434,42 @@ def DemoCuboidsMesh(N=16, condition=cube_condition):
     mf3 = d.MeshFunction("size_t", mesh, 3, 0)
     mf2 = d.MeshFunction("size_t", mesh, 2, 0)
 
-    # Mark all cells that satisfy condition as 3, else 1
-    for c in d.cells(mesh):
-        mf3[c] = 2 if condition(c) else 1
-
-    # Mark facets
-    for f in d.faces(mesh):
-        topology, cellIndices = facet_topology(f, mf3)
-        if topology == "interface":
-            mf2[f] = 12
-        elif topology == "boundary":
-            mf2[f] = int(cellIndices[0] * 10)
-        else:
-            mf2[f] = 0
+    # Mark all cells that satisfy condition as 2, else 1
+    num_cells = mesh.num_cells()
+    cell_midpoints = mesh.coordinates()[mesh.cells()].mean(axis=1)
+    try:
+        in_condition = np.asarray(condition(cell_midpoints))
+    except (AttributeError, TypeError, ValueError):
+        # condition only accepts a single d.Cell
+        in_condition = None
+    if (
+        in_condition is None
+        or in_condition.dtype != bool
+        or in_condition.shape != (num_cells,)
+    ):
+        in_condition = np.fromiter(
+            (condition(cell) for cell in d.cells(mesh)), dtype=bool, count=num_cells
+        )
+    mf3.array()[:] = np.where(in_condition, 2, 1)
+
+    # Mark facets using the markers of their adjacent cells
+    # (every cell of a tetrahedral mesh has 4 facets)
+    mesh.init(3, 2)
+    facets = mesh.topology()(3, 2)()
+    facet_cell_markers = np.repeat(mf3.array().astype(np.int64), 4)
+    num_facets = mesh.num_entities(2)
+    num_facet_cells = np.bincount(facets, minlength=num_facets)
+    if np.any(num_facet_cells > 2):
+        raise Exception("Facet has more than two cells")
+    max_marker = np.zeros(num_facets, dtype=np.int64)
+    np.maximum.at(max_marker, facets, facet_cell_markers)
+    min_marker = np.full(num_facets, facet_cell_markers.max(), dtype=np.int64)
+    np.minimum.at(min_marker, facets, facet_cell_markers)
+    mf2.array()[:] = np.select(
+        [num_facet_cells == 1, min_marker != max_marker],  # boundary, interface
+        [10 * max_marker, 12],
+        default=0,
+    )
     return (mesh, mf2, mf3)
 
 
@@ -549,6 +552,12 @@ def DemoSpheresMesh(
         gmsh.model.add_physical_group(3, outer_volume, tag=outer_vol_tag)
         gmsh.model.add_physical_group(3, inner_volume, tag=inner_vol_tag)
 
+    # gmsh calls meshSizeCallback for every candidate point, so evaluate
+    # everything that does not depend on the point once here
+    lc1 = hEdge
+    lc2 = hInnerEdge
+    lc3 = 0.2 * outerRad if np.isclose(innerRad, 0) else 0.2 * innerRad
+
     def meshSizeCallback(dim, tag, x, y, z, lc):
         # mesh length is hEdge at the PM (defaults to 0.1*outerRad,
         # or set when calling function) and hInnerEdge at the ERM
@@ -561,10 +570,7 @@ def DemoSpheresMesh(
         # then lc = 0.2*outerRad in the whole volume
         # for two spheres, if hEdge or hInnerEdge > 0.2*innerRad,
         # they are set to lc = 0.2*innerRad
-        R = np.sqrt(x**2 + y**2 + z**2)
-        lc1 = hEdge
-        lc2 = hInnerEdge
-        lc3 = 0.2 * outerRad if np.isclose(innerRad, 0) else 0.2 * innerRad
+        R = math.sqrt(x * x + y * y + z * z)
         if R > innerRad:
             lcTest = lc1 + (lc2 - lc1) * (outerRad - R) / (outerRad - innerRad)
         else:
@@ -581,26 +587,39 @@ def DemoSpheresMesh(
     gmsh.option.setNumber("Mesh.Algorithm", 5)
 
     gmsh.model.mesh.generate(3)
-    gmsh.write("twoSpheres.msh")  # save locally
-    gmsh.finalize()
-
-    # load, convert to xdmf, and save as temp files
-    mesh3d_in = meshio.read("twoSpheres.msh")
 
-    def create_mesh(mesh, cell_type):
-        cells = mesh.get_cells_type(cell_type)
-        cell_data = mesh.get_cell_data(
-            "gmsh:physical", cell_type
-        )  # extract values of tags
+    # extract the mesh and physical tags directly from gmsh (rather than writing
+    # and re-reading a .msh file)
+    node_tags, node_coords, _ = gmsh.model.mesh.getNodes()
+    points = np.reshape(node_coords, (-1, 3))
+    node_index = np.zeros(int(node_tags.max()) + 1, dtype=np.int64)
+    node_index[node_tags.astype(np.int64)] = np.arange(len(node_tags))
+
+    def create_mesh(dim, cell_type, gmsh_element_type, num_nodes):
+        cells, cell_data = [], []
+        for _, tag in gmsh.model.getPhysicalGroups(dim):
+            for entity in gmsh.model.getEntitiesForPhysicalGroup(dim, tag):
+                _, elem_node_tags = gmsh.model.mesh.getElementsByType(
+                    gmsh_element_type, entity
+                )
+                entity_cells = node_index[
+                    np.reshape(elem_node_tags, (-1, num_nodes)).astype(np.int64)
+                ]
+                cells.append(entity_cells)
+                cell_data.append(np.full(len(entity_cells), tag, dtype=np.int64))
         out_mesh = meshio.Mesh(
-            points=mesh.points,
-            cells={cell_type: cells},
-            cell_data={"mf_data": [cell_data]},
+            points=points,
+            cells={cell_type: np.vstack(cells)},
+            cell_data={"mf_data": [np.concatenate(cell_data)]},
         )
         return out_mesh
 
-    tet_mesh = create_mesh(mesh3d_in, "tetra")
-    tri_mesh = create_mesh(mesh3d_in, "triangle")
+    # gmsh element types: 4 - 4-node tetrahedron, 2 - 3-node triangle
+    tet_mesh = create_mesh(3, "tetra", 4, 4)
+    tri_mesh = create_mesh(2, "triangle", 2, 3)
+    gmsh.finalize()
+
+    # save as temp xdmf files
     meshio.write("tempmesh_3dout.xdmf", tet_mesh)
     meshio.write("tempmesh_2dout.xdmf", tri_mesh)
 
@@ -612,30 +631,33 @@ def DemoSpheresMesh(
         infile.read(mvc3, "mf_data")
     mf3 = d.cpp.mesh.MeshFunctionSizet(dmesh, mvc3)
     # set unassigned volumes to tag=0
-    mf3.array()[np.where(mf3.array() > 1e9)[0]] = 0
+    np.putmask(mf3.array(), mf3.array() > 1e9, 0)
     mvc2 = d.MeshValueCollection("size_t", dmesh, 2)
     with d.XDMFFile("tempmesh_2dout.xdmf") as infile:
         infile.read(mvc2, "mf_data")
     mf2 = d.cpp.mesh.MeshFunctionSizet(dmesh, mvc2)
     # set inner faces to tag=0
-    mf2.array()[np.where(mf2.array() > 1e9)[0]] = 0
+    np.putmask(mf2.array(), mf2.array() > 1e9, 0)
 
     # use os to remove temp meshes
     os.remove("tempmesh_2dout.xdmf")
     os.remove("tempmesh_3dout.xdmf")
     os.remove("tempmesh_2dout.h5")
     os.remove("tempmesh_3dout.h5")
-    os.remove("twoSpheres.msh")
     # return dolfin mesh, mf2 (2d tags) and mf3 (3d tags)
     return (dmesh, mf2, mf3)
 
 
-def write_mesh(mesh, mf2, mf3, filename="DemoCuboidMesh"):
+def write_mesh(mesh, mf2, mf3, filename="DemoCuboidMesh", write_pvd=True):
     # Write mesh and meshfunctions to file
-    hdf5 = d.HDF5File(mesh.mpi_comm(), filename + ".h5", "w")
-    hdf5.write(mesh, "/mesh")
-    hdf5.write(mf3, "/mf3")
-    hdf5.write(mf2, "/mf2")
+    # (write_pvd=False skips the visualization files, only the HDF5 file is
+    # needed to load the mesh again)
+    # (closing the file as soon as it is written so it is flushed to disk)
+    with d.HDF5File(mesh.mpi_comm(), filename + ".h5", "w") as hdf5:
+        hdf5.write(mesh, "/mesh")
+        hdf5.write(mf3, "/mf3")
+        hdf5.write(mf2, "/mf2")
     # For visualization of domains
-    d.File(f"{filename}_mf3.pvd") << mf3
-    d.File(f"{filename}_mf2.pvd") << mf2
+    if write_pvd:
+        d.File(f"{filename}_mf3.pvd") << mf3
+        d.File(f"{filename}_mf2.pvd") << mf2
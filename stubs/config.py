@@ -30,6 +30,8 @@ _loglevel_to_int: Dict[str, int] = {
 global_settings = {
     "main_dir": None,
     "log_filename": None,
+    # If False, only the root rank formats and prints fancy_print messages
+    "print_on_all_ranks": True,
     # These functions will be substituted into any expressions
     "dolfin_expressions": {
         "exp": d.exp,
@@ -85,6 +87,19 @@ class SolverConfig(BaseConfig):
     :param final_t: End time of simulation
     :param use_snes: Use PETScSNES solver if true, else use DOLFINs NewtonSolver
     :param snes_preassemble_linear_system: If True separate linear components during assembly
+    :param snes_matrix_free: If True the SNES solver applies the Jacobian matrix-free
+        (finite differences of the residual) and only uses the assembled Jacobian to
+        build the preconditioner
+    :param snes_reuse_constant_jacobian: If True Jacobian subforms that only depend on
+        constants (e.g. mass and diffusion terms) are only re-assembled when the values
+        of those constants change
+    :param snes_lag_preconditioner: Rebuild the preconditioner only every this many
+        Jacobian assemblies (it is kept across time-steps), 1 rebuilds it every time
+    :param snes_options_prefix: Options prefix of the SNES solver (and its KSP/PC), the
+        solver settings can be overridden from the command line/PETSc options database,
+        e.g. `-stubs_ksp_type gmres -stubs_fieldsplit_0_pc_type ilu`
+    :param form_compiler_parameters: Parameters passed to the form compiler (FFC) when
+        the block residual/Jacobian forms are compiled
     :param initial_dt: Initial time-stepping
     :param adjust_dt: A tuple (t, dt) of floats indicating when to next adjust the
         time-stepping and to what value
@@ -100,6 +115,18 @@ class SolverConfig(BaseConfig):
     snes_preassemble_linear_system: bool = (
         False  #: .. warning:: FIXME Currently untested
     )
+    snes_matrix_free: bool = False
+    snes_reuse_constant_jacobian: bool = False
+    snes_lag_preconditioner: int = 1
+    snes_options_prefix: str = "stubs_"
+    form_compiler_parameters: Dict[str, Any] = field(
+        default_factory=lambda: {
+            "representation": "uflacs",
+            "optimize": True,
+            "cpp_optimize": True,
+            "cpp_optimize_flags": "-O3",
+        }
+    )
     initial_dt: Optional[float] = None
     adjust_dt: Optional[Tuple[float, float]] = None
     time_precision: int = 6
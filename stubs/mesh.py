@@ -1,11 +1,11 @@
 """
 Wrapper around dolfin mesh class (originally for submesh implementation - possibly unneeded now)
 """
+from functools import cached_property
 from typing import Dict, FrozenSet
 
 import dolfin as d
 import numpy as np
-from cached_property import cached_property
 
 from .common import _fancy_print as fancy_print
 
@@ -104,6 +104,16 @@ class _Mesh:
     def facet_coordinates(self):
         return self.vertices[self.facets]
 
+    # Midpoints of entities, shape (num_entities, dim). These can be passed to
+    # vectorized conditions such as common.cube_condition
+    @cached_property
+    def cell_midpoints(self):
+        return self.cell_coordinates.mean(axis=1)
+
+    @cached_property
+    def facet_midpoints(self):
+        return self.facet_coordinates.mean(axis=1)
+
     # Generalized volume
     @cached_property
     def nvolume(self):
@@ -176,13 +186,29 @@ class ParentMesh(_Mesh):
     def all_meshes(self):
         return dict(list(self.child_meshes.items()) + list({self.name: self}.items()))
 
+    def _init_connectivity(self):
+        """
+        Compute all the connectivities used downstream (facet/cell/vertex) once
+        up front so that they are not lazily built during the first solve
+        """
+        tdim = self.dimensionality
+        self.dolfin_mesh.init(tdim - 1)
+        for d1, d2 in [
+            (tdim, tdim - 1),
+            (tdim - 1, tdim),
+            (tdim, 0),
+            (tdim - 1, 0),
+            (0, tdim),
+        ]:
+            self.dolfin_mesh.init(d1, d2)
+        if d.MPI.size(self.dolfin_mesh.mpi_comm()) > 1:
+            self.dolfin_mesh.init_global(tdim - 1)
+
     def load_mesh_from_xml(self, mesh_filename):
         self.dolfin_mesh = d.Mesh(mesh_filename)
 
         self.dimensionality = self.dolfin_mesh.topology().dim()
-        self.dolfin_mesh.init(self.dimensionality - 1)
-        self.dolfin_mesh.init(self.dimensionality - 1, self.dimensionality)
-        self.dolfin_mesh.init(self.dimensionality - 1, self.dimensionality)
+        self._init_connectivity()
 
         print(
             f'XML mesh, "{self.name}", successfully loaded from file: {mesh_filename}!'
@@ -200,9 +226,7 @@ class ParentMesh(_Mesh):
         hdf5.close()
 
         self.dimensionality = self.dolfin_mesh.topology().dim()
-        self.dolfin_mesh.init(self.dimensionality - 1)
-        self.dolfin_mesh.init(self.dimensionality - 1, self.dimensionality)
-        self.dolfin_mesh.init(self.dimensionality - 1, self.dimensionality)
+        self._init_connectivity()
 
         print(
             f'HDF5 mesh, "{self.name}", successfully loaded from file: {mesh_filename}!'
@@ -244,45 +268,63 @@ class ParentMesh(_Mesh):
         if self.has_surface:
             self.mf["facets"] = self._read_parent_mesh_function_from_file(surface_dim)
 
-        # If any cell markers are given as a list we also create mesh
-        # functions to store the uncombined markers
+        # If any cell markers are given as a list we also store the uncombined
+        # markers (copied from the mesh functions we just read)
         if any(
             [
                 (child_mesh.marker_list is not None and not child_mesh.is_surface)
                 for child_mesh in self.child_meshes.values()
             ]
         ):
-            self.mf["cells_uncombined"] = self._read_parent_mesh_function_from_file(
-                volume_dim
-            )
+            self.mf["cells_uncombined"] = self._copy_mesh_function(self.mf["cells"])
         if any(
             [
                 (child_mesh.marker_list is not None and child_mesh.is_surface)
                 for child_mesh in self.child_meshes.values()
             ]
         ):
-            self.mf["facets_uncombined"] = self._read_parent_mesh_function_from_file(
-                surface_dim
-            )
+            self.mf["facets_uncombined"] = self._copy_mesh_function(self.mf["facets"])
 
         # Combine markers in a list
         for child_mesh in self.child_meshes.values():
             if child_mesh.marker_list is None:
                 continue
-            for marker in child_mesh.marker_list:
-                if not child_mesh.is_surface:
-                    self.mf["cells"].array()[
-                        self.mf["cells_uncombined"].array() == marker
-                    ] = child_mesh.primary_marker
-                if child_mesh.is_surface:
-                    self.mf["facets"].array()[
-                        self.mf["facets_uncombined"].array() == marker
-                    ] = child_mesh.primary_marker
+            mf_type = "facets" if child_mesh.is_surface else "cells"
+            self.mf[mf_type].array()[
+                np.isin(
+                    self.mf[f"{mf_type}_uncombined"].array(), child_mesh.marker_list
+                )
+            ] = child_mesh.primary_marker
+
+    def _copy_mesh_function(self, mf):
+        mf_copy = d.MeshFunction("size_t", self.dolfin_mesh, mf.dim(), value=0)
+        mf_copy.array()[:] = mf.array()
+        return mf_copy
 
     @property
     def has_surface(self):
         return self.min_dim < self.max_dim
 
+    @cached_property
+    def _volume_to_surface_entities(self):
+        "(num volume entities) x (surface entities per volume entity) connectivity"
+        volume_dim, surface_dim = self.mf["cells"].dim(), self.mf["facets"].dim()
+        self.dolfin_mesh.init(volume_dim, surface_dim)
+        connectivity = self.dolfin_mesh.topology()(volume_dim, surface_dim)()
+        return np.asarray(connectivity).reshape(self.mf["cells"].size(), -1)
+
+    def surface_touches_volume(self, surface_marker, volume_marker):
+        """
+        Check if any surface entity marked with surface_marker bounds a volume entity
+        marked with volume_marker (on any process)
+        """
+        is_surface_entity = self.mf["facets"].array() == surface_marker
+        volume_entities = self._volume_to_surface_entities[
+            self.mf["cells"].array() == volume_marker
+        ]
+        touches = bool(is_surface_entity[volume_entities].any())
+        return d.MPI.max(self.dolfin_mesh.mpi_comm(), int(touches)) > 0
+
     @property
     def child_surface_meshes(self):
         return [cm for cm in self.child_meshes.values() if cm.is_surface]
@@ -409,7 +451,7 @@ class ChildMesh(_Mesh):
             )
         # Set the values of intersection_map
         self.intersection_map[mesh_id_set].set_values(
-            intersection_map_values.astype(np.int)
+            intersection_map_values.astype(np.uintp)
         )
 
         # Check if the intersection is empty
@@ -421,13 +463,9 @@ class ChildMesh(_Mesh):
         self.intersection_map_parent[mesh_id_set] = d.MeshFunction(
             "size_t", self.parent_mesh.dolfin_mesh, self.dimensionality, value=0
         )
-        # map from our cells to parent facets
-        mesh_to_parent = np.array(self.mesh_view[self.parent_mesh.id].cell_map())
-        indices = np.where(self.intersection_map[mesh_id_set].array() == 1)[
-            0
-        ]  # indices of our cells that intersect
-        # indices of parent facets that intersect
-        parent_indices = mesh_to_parent[indices]
+        # indices of parent facets that intersect (using the cached map from our
+        # cells to parent facets)
+        parent_indices = self.map_cell_to_parent_entity[intersection_map_values]
         self.intersection_map_parent[mesh_id_set].array()[parent_indices] = 1
 
     def get_intersection_submesh(self, mesh_id_set: FrozenSet[int]):
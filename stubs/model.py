@@ -1,17 +1,19 @@
 """
 Model class. Consists of parameters, species, etc. and is used for simulation
 """
-from collections import OrderedDict as odict
+from collections import Counter
 from dataclasses import dataclass
 from decimal import Decimal
 from itertools import chain
+from types import FunctionType
 
 import dolfin as d
 import numpy as np
 import pandas
 import petsc4py.PETSc as PETSc
 import sympy as sym
-from cached_property import cached_property
+import ufl
+from scipy.spatial import cKDTree
 from sympy.parsing.sympy_parser import parse_expr
 from tabulate import tabulate
 from ufl.algorithms.ad import expand_derivatives
@@ -36,11 +38,46 @@ from .model_assembly import (
     SpeciesContainer,
     empty_sbmodel,
 )
-from .solvers import stubsSNESProblem
+from .solvers import get_form_constants, stubsSNESProblem
 from .units import unit
 
 Print = PETSc.Sys.Print
 
+# numpy vector norm order -> dolfin (PETSc) vector norm type
+_vector_norm_types = {1: "l1", 2: "l2", np.inf: "linf"}
+
+# (number of compartments, number of volume compartments) -> reaction topology
+_reaction_topologies = {
+    (1, 1): "volume",
+    (1, 0): "surface",
+    (2, 1): "volume_surface",
+    (3, 2): "volume_surface_volume",
+}
+# (number of compartments, number of volume compartments) -> unsupported topology
+_reaction_topology_errors = {
+    (2, 2): (
+        NotImplementedError,
+        "Reaction {name} has two volumes - the adjoining surface must be specified "
+        "using reaction.explicit_restriction_to_domain",
+    ),
+    (2, 0): (
+        Exception,
+        "Reaction {name} involves two surfaces. This is not supported.",
+    ),
+    (3, 3): (
+        Exception,
+        "Reaction {name} involves three volumes. This is not supported.",
+    ),
+    (3, 1): (
+        Exception,
+        "Reaction {name} involves two or more surfaces. This is not supported.",
+    ),
+    (3, 0): (
+        Exception,
+        "Reaction {name} involves two or more surfaces. This is not supported.",
+    ),
+}
+
 
 @dataclass
 class Model:
@@ -98,6 +135,9 @@ class Model:
     def __post_init__(self):
         # # Check that solver_system is valid
 
+        # (min, max) compartment dimensions, see _get_min_max_dim()
+        self._min_max_dim = None
+
         # FunctionSpaces, Functions, etc
         self.V = dict()
         self.u = dict()
@@ -164,18 +204,21 @@ class Model:
     def child_meshes(self):
         return self.parent_mesh.child_meshes
 
-    @cached_property
+    def _get_min_max_dim(self):
+        "Compute (once) the min/max compartment dimensions in a single scan"
+        if self._min_max_dim is None:
+            dims = [comp.dimensionality for comp in self.cc]
+            self._min_max_dim = (min(dims), max(dims))
+            self.parent_mesh.min_dim, self.parent_mesh.max_dim = self._min_max_dim
+        return self._min_max_dim
+
+    @property
     def min_dim(self):
-        dim = min([comp.dimensionality for comp in self.cc])
-        self.parent_mesh.min_dim = dim
-        return dim
+        return self._get_min_max_dim()[0]
 
-    @cached_property
+    @property
     def max_dim(self):
-        dim = max([comp.dimensionality for comp in self.cc])
-        self.max_dim = dim
-        self.parent_mesh.max_dim = dim
-        return dim
+        return self._get_min_max_dim()[1]
 
     # ===========================================
     # Model - Initialization
@@ -202,11 +245,21 @@ class Model:
         self.dtvec = [self.dt]
         self.config.set_logger_levels()
 
-        self._init_1()
-        self._init_2()
-        self._init_3()
-        self._init_4()
-        self._init_5(initialize_solver)
+        # Run the initialization steps, timing each of them
+        # (per-step timings are stored in the stopwatch's pause_timings)
+        init_steps = [
+            self._init_1,
+            self._init_2,
+            self._init_3,
+            self._init_4,
+            lambda: self._init_5(initialize_solver),
+        ]
+        stopwatch = self.stopwatches["Total initialization"]
+        for init_step in init_steps:
+            stopwatch.start()
+            init_step()
+            stopwatch.pause()
+        stopwatch.stop()
 
         fancy_print("Model finished initialization!", format_type="title")
         if self.config.flags["print_verbose_info"]:
@@ -237,9 +290,7 @@ class Model:
         self._init_2_2_check_reaction_validity()
         self._init_2_3_link_reaction_properties()
         self._init_2_4_check_for_unused_parameters_species_compartments()
-        self._init_2_5_link_compartments_to_species()
-        self._init_2_6_link_species_to_compartments()
-        self._init_2_7_get_species_compartment_indices()
+        self._init_2_5_link_compartments_and_species()
         fancy_print(
             "Step 2 of initialization completed " "successfully!", text_color="magenta"
         )
@@ -267,10 +318,8 @@ class Model:
         self._init_4_1_get_active_compartments()
         self._init_4_2_define_dolfin_function_spaces()
         self._init_4_3_define_dolfin_functions()
-        self._init_4_4_get_species_u_v_V_dofmaps()
-        self._init_4_5_name_functions()
-        self._init_4_6_check_dolfin_function_validity()
-        self._init_4_7_set_initial_conditions()
+        self._init_4_4_setup_compartment_functions()
+        self._init_4_5_set_initial_conditions()
 
     def _init_5(self, initialize_solver):
         fancy_print(
@@ -314,14 +363,16 @@ class Model:
 
     def _init_1_2_check_namespace_conflicts(self):
         fancy_print("Checking for namespace conflicts", format_type="log")
-        self._all_keys = set()
-        containers = [self.pc, self.sc, self.cc, self.rc]
-        for keys in [c.keys for c in containers]:
-            self._all_keys = self._all_keys.union(keys)
-        if sum([c.size for c in containers]) != len(self._all_keys):
+        key_counts = Counter(
+            chain(self.pc.keys, self.sc.keys, self.cc.keys, self.rc.keys)
+        )
+        self._all_keys = set(key_counts)
+        duplicate_keys = [key for key, count in key_counts.items() if count > 1]
+        if duplicate_keys:
             raise ValueError(
                 "Model has a namespace conflict. There are "
-                "two parameters/species/compartments/reactions with the same name."
+                "two parameters/species/compartments/reactions with the same name: "
+                f"{duplicate_keys}."
             )
 
         protected_names = {"x[0]", "x[1]", "x[2]", "t", "unit_scale_factor"}
@@ -334,20 +385,23 @@ class Model:
             )
 
         # Make sure there are no overlapping markers or markers with value 0
-        self._all_markers = set()
-        for compartment in self.cc.values:
-            if isinstance(compartment.cell_marker, list):
-                marker_list = compartment.cell_marker
-            else:
-                marker_list = [compartment.cell_marker]
-
-            for marker in marker_list:
-                if marker in self._all_markers:
-                    raise ValueError(f"Two compartments have the same marker: {marker}")
-                elif marker == 0:
-                    raise ValueError("Marker cannot have the value 0")
-                else:
-                    self._all_markers.add(marker)
+        marker_counts = Counter(
+            marker
+            for compartment in self.cc.values
+            for marker in (
+                compartment.cell_marker
+                if isinstance(compartment.cell_marker, list)
+                else [compartment.cell_marker]
+            )
+        )
+        duplicate_markers = [m for m, count in marker_counts.items() if count > 1]
+        if duplicate_markers:
+            raise ValueError(
+                f"Two compartments have the same marker(s): {duplicate_markers}"
+            )
+        if 0 in marker_counts:
+            raise ValueError("Marker cannot have the value 0")
+        self._all_markers = set(marker_counts)
 
     def _init_1_3_check_parameter_dimensionality(self):
         if "x[2]" in self._all_keys and self.max_dim < 3:
@@ -392,20 +446,19 @@ class Model:
 
             # Custom reaction
             elif reaction.reaction_type in self.config.reaction_database.keys():
-                reaction.eqn_f_str = reaction._parse_custom_reaction(
+                reaction.eqn_f = reaction._parse_custom_reaction(
                     self.config.reaction_database[reaction.reaction_type]
                 )
+                reaction.eqn_f_str = str(reaction.eqn_f)
 
             # pre-defined equation string
             elif reaction.eqn_f_str or reaction.eqn_r_str:
                 if reaction.eqn_f_str:
-                    reaction.eqn_f_str = reaction._parse_custom_reaction(
-                        reaction.eqn_f_str
-                    )
+                    reaction.eqn_f = reaction._parse_custom_reaction(reaction.eqn_f_str)
+                    reaction.eqn_f_str = str(reaction.eqn_f)
                 if reaction.eqn_r_str:
-                    reaction.eqn_r_str = reaction._parse_custom_reaction(
-                        reaction.eqn_r_str
-                    )
+                    reaction.eqn_r = reaction._parse_custom_reaction(reaction.eqn_r_str)
+                    reaction.eqn_r_str = str(reaction.eqn_r)
 
             else:
                 raise ValueError(
@@ -413,22 +466,29 @@ class Model:
                     % reaction.name
                 )
 
+            # parse the flux strings once (custom reactions are already parsed),
+            # the sympy expressions are reused when checking validity and when
+            # creating fluxes
+            if reaction.eqn_f is None and reaction.eqn_f_str:
+                reaction.eqn_f = parse_expr(reaction.eqn_f_str)
+            if reaction.eqn_r is None and reaction.eqn_r_str:
+                reaction.eqn_r = parse_expr(reaction.eqn_r_str)
+
     def _init_2_2_check_reaction_validity(self):
         fancy_print(
             "Make sure all reactions have parameters/species defined",
             format_type="log",
         )
         # Make sure all reactions have parameters/species defined
+        # (dict key views support set operations directly)
+        pc_keys, sc_keys = self.pc.keys, self.sc.keys
         for reaction in self.rc:
-            for eqn_str in [reaction.eqn_f_str, reaction.eqn_r_str]:
-                if not eqn_str:
+            for eqn in [reaction.eqn_f, reaction.eqn_r]:
+                if eqn is None:
                     continue
-                eqn = parse_expr(eqn_str)
                 var_set = {str(x) for x in eqn.free_symbols}
-                param_set = var_set.intersection(self.pc.keys)
-                species_set = var_set.intersection(self.sc.keys)
-                if len(param_set) + len(species_set) != len(var_set):
-                    diff_set = var_set.difference(param_set.union(species_set))
+                diff_set = var_set - pc_keys - sc_keys
+                if diff_set:
                     raise NameError(
                         f"Reaction {reaction.name} refers to a parameter or "
                         f"species ({diff_set}) that is not in the model."
@@ -462,39 +522,12 @@ class Model:
             reaction.num_species = len(reaction.species)
 
             is_volume = [c.is_volume for c in reaction.compartments.values()]
-            if len(is_volume) == 1:
-                if is_volume[0]:
-                    reaction.topology = "volume"
-                else:
-                    reaction.topology = "surface"
-            elif len(is_volume) == 2:
-                if all(is_volume):
-                    raise NotImplementedError(
-                        f"Reaction {reaction.name} has two volumes - "
-                        "the adjoining surface must be specified "
-                        "using reaction.explicit_restriction_to_domain"
-                    )
-                    # reaction.topology = 'volume_volume'
-                elif not any(is_volume):
-                    raise Exception(
-                        f"Reaction {reaction.name} involves two surfaces. "
-                        "This is not supported."
-                    )
-                else:
-                    reaction.topology = "volume_surface"
-            elif len(is_volume) == 3:
-                if sum(is_volume) == 3:
-                    raise Exception(
-                        f"Reaction {reaction.name} involves three volumes. "
-                        "This is not supported."
-                    )
-                elif sum(is_volume) < 2:
-                    raise Exception(
-                        f"Reaction {reaction.name} involves two or more surfaces. "
-                        "This is not supported."
-                    )
-                else:
-                    reaction.topology = "volume_surface_volume"
+            topology_key = (len(is_volume), sum(is_volume))
+            if topology_key in _reaction_topologies:
+                reaction.topology = _reaction_topologies[topology_key]
+            elif topology_key in _reaction_topology_errors:
+                error_type, message = _reaction_topology_errors[topology_key]
+                raise error_type(message.format(name=reaction.name))
             else:
                 raise ValueError(
                     "Number of compartments involved in a flux must be in [1,2,3]!"
@@ -506,16 +539,20 @@ class Model:
             format_type="log",
         )
 
-        all_parameters = set(chain.from_iterable([r.parameters for r in self.rc]))
-        all_species = set(chain.from_iterable([r.species for r in self.rc]))
-        all_compartments = set(chain.from_iterable([r.compartments for r in self.rc]))
-        if all_parameters != set(self.pc.keys):
+        # gather everything used by reactions in a single pass
+        all_parameters, all_species, all_compartments = set(), set(), set()
+        for reaction in self.rc:
+            all_parameters.update(reaction.parameters)
+            all_species.update(reaction.species)
+            all_compartments.update(reaction.compartments)
+
+        unused_parameters = self.pc.keys - all_parameters
+        if unused_parameters:
             print_str = (
-                f"Parameter(s), {set(self.pc.keys).difference(all_parameters)}, "
-                "are unused in any reactions."
+                f"Parameter(s), {unused_parameters}, are unused in any reactions."
             )
             if self.config.flags["allow_unused_components"]:
-                for parameter in set(self.pc.keys).difference(all_parameters):
+                for parameter in unused_parameters:
                     self.pc.remove(parameter)
                 fancy_print(print_str, format_type="log_urgent")
                 fancy_print(
@@ -524,13 +561,11 @@ class Model:
                 )
             else:
                 raise ValueError(print_str)
-        if all_species != set(self.sc.keys):
-            print_str = (
-                f"Species, {set(self.sc.keys).difference(all_species)}, "
-                "are unused in any reactions."
-            )
+        unused_species = self.sc.keys - all_species
+        if unused_species:
+            print_str = f"Species, {unused_species}, are unused in any reactions."
             if self.config.flags["allow_unused_components"]:
-                for species in set(self.sc.keys).difference(all_species):
+                for species in unused_species:
                     self.sc.remove(species)
                 fancy_print(print_str, format_type="log_urgent")
                 fancy_print(
@@ -538,13 +573,13 @@ class Model:
                 )
             else:
                 raise ValueError(print_str)
-        if all_compartments != set(self.cc.keys):
+        unused_compartments = self.cc.keys - all_compartments
+        if unused_compartments:
             print_str = (
-                f"Compartment(s), {set(self.cc.keys).difference(all_compartments)}, "
-                "are unused in any reactions."
+                f"Compartment(s), {unused_compartments}, are unused in any reactions."
             )
             if self.config.flags["allow_unused_components"]:
-                for compartment in set(self.cc.keys).difference(all_compartments):
+                for compartment in unused_compartments:
                     self.cc.remove(compartment)
                 fancy_print(print_str, format_type="log_urgent")
                 fancy_print(
@@ -554,33 +589,23 @@ class Model:
             else:
                 raise ValueError(print_str)
 
-    def _init_2_5_link_compartments_to_species(self):
+    def _init_2_5_link_compartments_and_species(self):
         fancy_print(
-            "Linking compartments and compartment dimensionality to species",
+            "Linking compartments and species (and getting species indices)",
             format_type="log",
         )
-        for species in self.sc:
-            species.compartment = self.cc[species.compartment_name]
-            species.dimensionality = self.cc[species.compartment_name].dimensionality
-
-    def _init_2_6_link_species_to_compartments(self):
-        fancy_print("Linking species to compartments", format_type="log")
         # An species is considered to be "in a compartment" if it is
         # involved in a reaction there
         for species in self.sc:
-            species.compartment.species.update({species.name: species})
+            compartment = self.cc[species.compartment_name]
+            species.compartment = compartment
+            species.dimensionality = compartment.dimensionality
+            compartment.species[species.name] = species
+        # Get indices for species for each compartment
         for compartment in self.cc:
             compartment.num_species = len(compartment.species)
-
-    def _init_2_7_get_species_compartment_indices(self):
-        fancy_print(
-            "Getting indices for species for each compartment", format_type="log"
-        )
-        for compartment in self.cc:
-            index = 0
-            for species in list(compartment.species.values()):
+            for index, species in enumerate(compartment.species.values()):
                 species.dof_index = index
-                index += 1
 
     # Step 3 - Mesh Initializations
     def _init_3_1_define_child_meshes(self):
@@ -620,11 +645,15 @@ class Model:
         )
 
         # not creating maps with build_mapping() will lead to a
-        # segfault when trying to assemble
+        # segfault when trying to assemble. Mappings are only built between surfaces
+        # and the volumes they bound, so reactions coupling a surface to a volume it
+        # does not touch are rejected below (rather than crashing during assembly)
         # we also suppress the c++ output because it prints a lot of 'errors'
         # even though the mapping was successfully built
         # (when (surface intersect volume) != surface)
         # with common._stdout_redirected():
+        # (surface, volume) compartment names of pairs that share no facets
+        nonadjacent_pairs = set()
         for child_mesh in self.parent_mesh.child_surface_meshes:
             for sibling_volume_mesh in self.parent_mesh.child_volume_meshes:
                 if hasattr(child_mesh.compartment, "nonadjacent_compartment_list"):
@@ -640,8 +669,35 @@ class Model:
                             format_type="log",
                         )
                         continue
+                # build_mapping is expensive, skip pairs that share no facets
+                if not self.parent_mesh.surface_touches_volume(
+                    child_mesh.primary_marker, sibling_volume_mesh.primary_marker
+                ):
+                    fancy_print(
+                        f"Skipping mapping between {child_mesh.compartment.name} and "
+                        f"{sibling_volume_mesh.compartment.name} (not adjacent)",
+                        format_type="log",
+                    )
+                    nonadjacent_pairs.add(
+                        (
+                            child_mesh.compartment.name,
+                            sibling_volume_mesh.compartment.name,
+                        )
+                    )
+                    continue
                 child_mesh.dolfin_mesh.build_mapping(sibling_volume_mesh.dolfin_mesh)
 
+        for reaction in self.rc:
+            for surface in reaction.compartments.values():
+                if surface.is_volume:
+                    continue
+                for volume in reaction.compartments.values():
+                    if (surface.name, volume.name) in nonadjacent_pairs:
+                        raise ValueError(
+                            f"Reaction {reaction.name} couples surface {surface.name} "
+                            f"and volume {volume.name}, which share no facets."
+                        )
+
     def _init_3_7_get_integration_measures(self):
         fancy_print(
             "Getting integration measures for parent mesh and child meshes",
@@ -660,18 +716,28 @@ class Model:
         value does not change the underlying dolfin object.
         Values must be assigned via paramter.dolfin_constant.assign()
         """
+        # Expressions only depend on the (shared) time constant, so parameters
+        # with the same expression can share one (JIT-compiled) dolfin.Expression
+        dolfin_expressions = dict()
         # Create a dolfin.Constant() for constant parameters
         for parameter in self.pc.values:
             if parameter.type == "constant":
                 parameter.dolfin_constant = d.Constant(parameter.value)
             elif parameter.type == "expression" and not parameter.use_preintegration:
-                parameter.dolfin_expression = d.Expression(
-                    sym.printing.ccode(parameter.sym_expr), t=self.T, degree=1
-                )
+                expression_str = sym.printing.ccode(parameter.sym_expr)
+                if expression_str not in dolfin_expressions:
+                    dolfin_expressions[expression_str] = d.Expression(
+                        expression_str, t=self.T, degree=1
+                    )
+                parameter.dolfin_expression = dolfin_expressions[expression_str]
             elif parameter.type == "expression" and parameter.use_preintegration:
                 parameter.dolfin_constant = d.Constant(parameter.value)
             elif parameter.type == "from_file":
                 parameter.dolfin_constant = d.Constant(parameter.value)
+        # Parameters that have to be updated at every time-step
+        self._time_dependent_parameters = [
+            parameter for parameter in self.pc.values if parameter.is_time_dependent
+        ]
 
     def _init_4_1_get_active_compartments(self):
         """
@@ -679,11 +745,24 @@ class Model:
         (We want to have the highest number of dofs first)
         """
         # addressing https://github.com/justinlaughlin/stubs/issues/36
-        self._active_compartments = list(self.cc.Dict.values())
         self._all_compartments = list(self.cc.Dict.values())
-        for compartment in self._active_compartments:
-            if compartment.num_species < 1:
-                self._active_compartments.remove(compartment)
+        # (filter in one pass, removing while iterating would skip compartments)
+        self._active_compartments = [
+            compartment
+            for compartment in self._all_compartments
+            if compartment.num_species >= 1
+        ]
+
+        # function spaces are not defined yet so estimate the number of dofs
+        # from the (global) number of mesh vertices. Sorting is stable so
+        # compartments with the same number of dofs keep their order
+        def estimated_num_dofs(compartment):
+            num_vertices = self.child_meshes[compartment.name].num_vertices
+            return compartment.num_species * d.MPI.sum(
+                self.mpi_comm_world, float(num_vertices)
+            )
+
+        self._active_compartments.sort(key=estimated_num_dofs, reverse=True)
         for idx, compartment in enumerate(self._active_compartments):
             compartment.dof_index = idx
 
@@ -778,6 +857,7 @@ class Model:
         self.v = d.TestFunctions(self.W)  # list of TestFunctions
 
         # Create references in compartments to the subfunctions
+        self._usplit = []
         for compartment in self._active_compartments:
             # alias
             cidx = compartment.dof_index
@@ -788,7 +868,9 @@ class Model:
                 # u is a function from a MixedFunctionSpace so u.sub()
                 # is appropriate here
                 compartment.u[key] = sub(func, cidx)  # func.sub(cidx)
-                if compartment.u[key].num_sub_spaces() > 1:
+                # (compartments with more than one species use a
+                # VectorFunctionSpace, see _init_4_2)
+                if compartment.num_species > 1:
                     # _usplit are the actual functions we use to construct
                     # variational forms
                     compartment._usplit[key] = d.split(compartment.u[key])
@@ -803,94 +885,98 @@ class Model:
             compartment.ut = sub(self.ut, cidx)  # self.ut[cidx]
             compartment.v = sub(self.v, cidx)  # self.v[cidx]
 
-        # save these in model
-        self._usplit = [c._usplit["u"] for c in self._active_compartments]
+            # save these in model
+            self._usplit.append(compartment._usplit["u"])
 
-    def _init_4_4_get_species_u_v_V_dofmaps(self):
+    def _init_4_4_setup_compartment_functions(self, check_validity=True):
+        """
+        Extracts subfunctions/function spaces/dofmaps for each species, names the
+        compartment and species functions and (optionally) checks that the dolfin
+        functions were created correctly, in a single pass over the compartments.
+        The validity checks are sanity checks... If an error occurs there it is
+        likely an internal bug...
+        """
         fancy_print(
             "Extracting subfunctions/function spaces/dofmap for each species",
             format_type="log",
         )
+        fancy_print("Naming functions and subfunctions", format_type="log")
+        if check_validity:
+            fancy_print(
+                "Checking that dolfin functions were created correctly",
+                format_type="log",
+            )
         for compartment in self._active_compartments:
+            if check_validity:
+                self._check_compartment_function_validity(compartment)
+            # name of the compartment function
+            for key in compartment.u.keys():
+                compartment.u[key].rename(f"{compartment.name}_{key}", "")
             # loop through species and add the name/index
             for species in compartment.species.values():
-                species.V = sub(compartment.V, species.dof_index)
-                species.v = sub(compartment.v, species.dof_index)
+                sidx = species.dof_index
+                species.V = sub(compartment.V, sidx)
+                species.v = sub(compartment.v, sidx)
                 species.dof_map = self.dolfin_get_dof_indices(
                     species
                 )  # species.V.dofmap().dofs()
 
+                prefix = f"{compartment.name}_{sidx}_{species.name}"
                 for key in compartment.u.keys():
-                    # compartment.u[key].sub(species.dof_index)
-                    species.u[key] = sub(compartment.u[key], species.dof_index)
-                    # compartment.u[key].sub(species.dof_index)
-                    species._usplit[key] = sub(
-                        compartment._usplit[key], species.dof_index
-                    )
-                species.ut = sub(compartment.ut, species.dof_index)
-
-    def _init_4_5_name_functions(self):
-        fancy_print("Naming functions and subfunctions", format_type="log")
-        for compartment in self._active_compartments:
-            # name of the compartment function
-            for key in self.u.keys():
-                compartment.u[key].rename(f"{compartment.name}_{key}", "")
-                # loop through species and add the name/index
-                for species in compartment.species.values():
-                    sidx = species.dof_index
+                    species.u[key] = sub(compartment.u[key], sidx)
+                    species._usplit[key] = sub(compartment._usplit[key], sidx)
+                    # single species compartments: the species function is the
+                    # compartment function so it is already named
                     if compartment.num_species > 1:
-                        species.u[key].rename(
-                            f"{compartment.name}_{sidx}_{species.name}_{key}", ""
-                        )
+                        species.u[key].rename(f"{prefix}_{key}", "")
+                species.ut = sub(compartment.ut, sidx)
 
-    def _init_4_6_check_dolfin_function_validity(self):
+    def _check_compartment_function_validity(self, compartment):
         "Sanity check... If an error occurs here it is likely an internal bug..."
-        fancy_print(
-            "Checking that dolfin functions were created correctly", format_type="log"
-        )
-        # sanity check
-        for compartment in self._active_compartments:  # self.cc:
-            idx = compartment.dof_index
-            compartment.num_dofs
-            compartment.num_dofs_local
-            # function size == dofs
-            if self.mpi_size == 1:
-                assert compartment.u["u"].vector().size() == compartment._num_dofs
-            if self.mpi_size >= 1:
-                assert (
-                    compartment.u["u"].vector().get_local().size
-                    == compartment._num_dofs_local
-                )
+        idx = compartment.dof_index
+        compartment.num_dofs
+        compartment.num_dofs_local
+        # function size == dofs
+        if self.mpi_size == 1:
+            assert compartment.u["u"].vector().size() == compartment._num_dofs
+        if self.mpi_size >= 1:
+            assert (
+                compartment.u["u"].vector().get_local().size
+                == compartment._num_dofs_local
+            )
 
-            # number of sub spaces == number of species
-            if compartment.num_species == 1:
-                for ukey in compartment.u.keys():
-                    assert compartment.u[ukey].num_sub_spaces() == 0
-            else:
-                for ukey in compartment.u.keys():
-                    assert (
-                        compartment.u[ukey].num_sub_spaces() == compartment.num_species
-                    )
+        # number of sub spaces == number of species
+        if compartment.num_species == 1:
+            for ukey in compartment.u.keys():
+                assert compartment.u[ukey].num_sub_spaces() == 0
+        else:
+            for ukey in compartment.u.keys():
+                assert compartment.u[ukey].num_sub_spaces() == compartment.num_species
 
-            # function space matches W.sub(idx)
-            for func in list(compartment.u.values()) + [compartment.v]:
-                assert func.function_space().id() == self.W.sub_space(idx).id()
+        # function space matches W.sub(idx)
+        for func in list(compartment.u.values()) + [compartment.v]:
+            assert func.function_space().id() == self.W.sub_space(idx).id()
 
-    def _init_4_7_set_initial_conditions(self):
-        "Sets the function values to initial conditions"
+    def _init_4_5_set_initial_conditions(self):
+        """
+        Sets the function values to initial conditions.
+        Initial conditions of all species in a compartment are gathered into one
+        array and written to the compartment function with a single set_local()
+        """
         fancy_print("Set function values to initial conditions", format_type="log")
-        for species in self.sc:
-            for ukey in species.u.keys():
-                if isinstance(species.initial_condition, float) or not isinstance(
-                    species.initial_condition, str
-                ):
-                    self.dolfin_set_function_values(
-                        species, ukey, species.initial_condition
-                    )
-                else:
-                    self.dolfin_set_function_values(
-                        species, ukey, species.initial_condition_expression
-                    )
+        for compartment in self._active_compartments:
+            for ukey in compartment.u.keys():
+                uvec = compartment.u[ukey].vector()
+                values = uvec.get_local()
+                for species in compartment.species.values():
+                    if isinstance(species.initial_condition, str):
+                        values[species.dof_map] = self.dolfin_eval_at_dof_coordinates(
+                            species, species.initial_condition_expression
+                        )
+                    else:
+                        values[species.dof_map] = species.initial_condition
+                uvec.set_local(values)
+                uvec.apply("insert")
 
     def _init_5_1_reactions_to_fluxes(self):
         fancy_print("Convert reactions to flux objects", format_type="log")
@@ -1036,7 +1122,12 @@ class Model:
         # in model.get_block_system()),
         # we are only going to separate fluxes that are linear with
         # respect to all compartments
-        self.Fsum_all = sum([f.lhs for f in self.forms])  # Sum of all forms
+        # Sum of all forms. Adding ufl Forms pairwise copies (and re-sorts) the
+        # accumulated integral list each time, so gather the integrals and build
+        # the summed Form once
+        self.Fsum_all = ufl.Form(
+            list(chain.from_iterable(f.lhs.integrals() for f in self.forms))
+        )
         if self.config.solver["snes_preassemble_linear_system"]:
             # debug attempt
             fancy_print(
@@ -1077,19 +1168,22 @@ class Model:
                 self.stopwatches,
                 self.config.solver["print_assembly"],
                 self.mpi_comm_world,
+                Jforms_constants=(
+                    self.Jblocks_constants
+                    if self.config.solver["snes_reuse_constant_jacobian"]
+                    else None
+                ),
             )
             # self.problem = stubsSNESProblem(self)
 
             self.problem.init_petsc_matnest()
             self.problem.init_petsc_vecnest()
-            if len(self.problem.global_sizes) == 1:
-                self._ubackend = u[0].vector().vec().copy()
-            else:
-                self._ubackend = PETSc.Vec().createNest(
-                    [usub.vector().vec().copy() for usub in u]
-                )
+            self._set_ubackend()
 
             self.solver = PETSc.SNES().create(self.mpi_comm_world)
+            # Options set on the command line/in the PETSc options database with this
+            # prefix take precedence over the defaults below
+            self.solver.setOptionsPrefix(self.config.solver["snes_options_prefix"])
 
             # Define the function/jacobian blocks
             self.solver.setFunction(self.problem.F, self.problem.Fpetsc_nest)
@@ -1102,8 +1196,21 @@ class Model:
                 print("  " + str(it) + " SNES Function norm " + "{:e}".format(fgnorm))
 
             self.solver.setMonitor(monitor)
-            opts = PETSc.Options()
-            opts["snes_linesearch_type"] = "l2"
+            opts = PETSc.Options(self.config.solver["snes_options_prefix"])
+            if not opts.hasName("snes_linesearch_type"):
+                opts["snes_linesearch_type"] = "l2"
+            if self.config.solver["snes_matrix_free"]:
+                # Jacobian action is approximated by finite differences of F,
+                # the assembled Jacobian is only used to build the preconditioner
+                fancy_print("Using matrix-free SNES operator", format_type="log")
+                opts["snes_mf_operator"] = True
+            if self.config.solver["snes_lag_preconditioner"] > 1:
+                # the preconditioner is only rebuilt every N Jacobian assemblies,
+                # including across time-steps
+                opts["snes_lag_preconditioner"] = self.config.solver[
+                    "snes_lag_preconditioner"
+                ]
+                opts["snes_lag_preconditioner_persists"] = True
             self.solver.setFromOptions()
 
             # These are some reasonable preconditioner/linear solver settings for block systems
@@ -1126,6 +1233,10 @@ class Model:
             self.solver.ksp.pc.setFieldSplitIS(*nest_indices_tuples)
             # 0 == 'additive' [jacobi], 1 == gauss-seidel
             self.solver.ksp.pc.setFieldSplitType(1)
+            # Let the options database override the default KSP/PC settings above
+            self.solver.ksp.setFromOptions()
+            if self.solver.ksp.pc.getType() != "fieldsplit":
+                return
             subksps = self.solver.ksp.pc.getFieldSplitSubKSP()
             for i, subksp in enumerate(subksps):
                 # subksp.setType('preonly')
@@ -1134,6 +1245,7 @@ class Model:
                 #     subksp.pc.setType('none')
                 subksp.setType("preonly")
                 subksp.pc.setType("hypre")
+                subksp.setFromOptions()
 
         else:
             fancy_print(
@@ -1209,77 +1321,118 @@ class Model:
             Fblock = Ftemp
 
         # debug attempt
-        J = []
-        for Fi in Fblock:
-            for uj in u:
-                if Fi is None:
-                    # pass
-                    J.append(None)
-                else:
-                    dFdu = expand_derivatives(d.derivative(Fi, uj))
-                    J.append(dFdu)
+        J = self._differentiate_blocks(Fblock, u)
 
         # Check number of blocks in the residual and solution are coherent
         assert len(J) == len(u) * len(u)
         assert len(Fblock) == len(u)
 
-        # Decompose F blocks into subforms based on domain of integration
-        # Fblock = [F0, F1, ... , Fn] where the index is the compartment index
-        # Flist  = [[F0(Omega_0), F0(Omega_1)], ..., [Fn(Omega_n)]]
-        # If a form has integrals on multiple domains, they are split into a list
+        Flist = self._split_block_F(Fblock)
+        Jlist = self._split_block_J(J, len(u))
+        global_sizes = [uj.function_space().dim() for uj in u]
+
+        # return Flist, Jlist
+        return Flist, Jlist, global_sizes
+
+    def _split_block_F(self, Fblock):
+        """
+        Decompose F blocks into subforms based on domain of integration
+        Fblock = [F0, F1, ... , Fn] where the index is the compartment index
+        Flist  = [[F0(Omega_0), F0(Omega_1)], ..., [Fn(Omega_n)]]
+        If a form has integrals on multiple domains, they are split into a list
+        """
+        fcp = self.config.solver["form_compiler_parameters"]
         Flist = list()
         for idx, Fi in enumerate(Fblock):
             if Fi is None or Fi.empty():
                 fancy_print(
-                    f"F{idx} = F[{self.cc.get_index(idx).name}]) is empty",
+                    f"F{idx} = F[{self._active_compartments[idx].name}]) is empty",
                     format_type="warning",
                 )
                 Flist.append([d.cpp.fem.Form(1, 0)])
-            else:
-                Fs = []
-                for Fsub in sub_forms_by_domain(Fi):
-                    if Fsub is None or Fsub.empty():
-                        domain = self.get_mesh_by_id(Fsub.mesh().id()).name
-                        fancy_print(
-                            f"F{idx} = F[{self.cc.get_index(idx).name}] "
-                            "is empty on integration domain {domain}",
-                            format_type="logred",
-                        )
-                        Fs.append(d.cpp.fem.Form(1, 0))
-                    else:
-                        Fs.append(d.Form(Fsub))
-                Flist.append(Fs)
-        # fancy_print("[problem] create list of residual forms OK", format_type='log')
+                continue
+            Fs = []
+            for Fsub in sub_forms_by_domain(Fi):
+                if Fsub is None or Fsub.empty():
+                    domain = self.get_mesh_by_id(Fsub.mesh().id()).name
+                    fancy_print(
+                        f"F{idx} = F[{self._active_compartments[idx].name}] is empty "
+                        f"on integration domain {domain}",
+                        format_type="logred",
+                    )
+                    Fs.append(d.cpp.fem.Form(1, 0))
+                else:
+                    Fs.append(d.Form(Fsub, form_compiler_parameters=fcp))
+            Flist.append(Fs)
+        return Flist
 
-        # Decompose J blocks into subforms based on domain of integration
+    def _split_block_J(self, J, num_blocks):
+        """
+        Decompose J blocks (flattened, row-major) into subforms based on domain of
+        integration. Also keeps track of the subforms that only depend on Constants
+        (self.Jblocks_constants)
+        """
+        fcp = self.config.solver["form_compiler_parameters"]
         Jlist = list()
+        Jconstants = list()
         for idx, Ji in enumerate(J):
-            idx_i, idx_j = divmod(idx, len(u))
+            idx_i, idx_j = divmod(idx, num_blocks)
             if Ji is None or Ji.empty():
                 fancy_print(
-                    f"J{idx_i}{idx_j} = dF[{self.cc.get_index(idx_i).name}])"
-                    f"/du[{self.cc.get_index(idx_j).name}] is empty",
+                    f"J{idx_i}{idx_j} = dF[{self._active_compartments[idx_i].name}])"
+                    f"/du[{self._active_compartments[idx_j].name}] is empty",
                     format_type="logred",
                 )
                 Jlist.append([d.cpp.fem.Form(2, 0)])
-            else:
-                Js = []
-                for Jsub in sub_forms_by_domain(Ji):
-                    if Jsub is None or Jsub.empty():
-                        domain = self.get_mesh_by_id(Jsub.mesh().id()).name
-                        fancy_print(
-                            f"J{idx_i}{idx_j} = dF[{self.cc.get_index(idx_i).name}])"
-                            f"/du[{self.cc.get_index(idx_j).name}]"
-                            f"is empty on integration domain {domain}",
-                            format_type="logred",
-                        )
-                    Js.append(d.Form(Jsub))
-                Jlist.append(Js)
+                Jconstants.append([None])
+                continue
+            Jsubs = sub_forms_by_domain(Ji)
+            for Jsub in Jsubs:
+                if Jsub is None or Jsub.empty():
+                    domain = self.get_mesh_by_id(Jsub.mesh().id()).name
+                    fancy_print(
+                        f"J{idx_i}{idx_j} = dF[{self._active_compartments[idx_i].name}])"
+                        f"/du[{self._active_compartments[idx_j].name}]"
+                        f"is empty on integration domain {domain}",
+                        format_type="logred",
+                    )
+            Jlist.append([d.Form(Jsub, form_compiler_parameters=fcp) for Jsub in Jsubs])
+            Jconstants.append([get_form_constants(Jsub) for Jsub in Jsubs])
+        self.Jblocks_constants = Jconstants
+        return Jlist
 
-        global_sizes = [uj.function_space().dim() for uj in u]
+    @staticmethod
+    def _differentiate_blocks(Fblock, u):
+        """
+        Jacobian blocks dFi/duj (flattened, row-major). Blocks where Fi does not
+        depend on uj are known to be empty, so the (expensive) derivative
+        expansion is skipped and None is used as a placeholder
+        """
+        J = []
+        for Fi in Fblock:
+            if Fi is None:
+                J.extend([None] * len(u))
+                continue
+            Fi_coefficients = set(Fi.coefficients())
+            for uj in u:
+                if uj in Fi_coefficients:
+                    J.append(expand_derivatives(d.derivative(Fi, uj)))
+                else:
+                    J.append(None)
+        return J
 
-        # return Flist, Jlist
-        return Flist, Jlist, global_sizes
+    def _set_ubackend(self):
+        """
+        PETSc solution vector passed to SNES. It holds copies of the vectors of the
+        dolfin (sub)functions: SNES also evaluates F at trial vectors (line search,
+        matrix-free differencing) which stubsSNESProblem.copy_u writes into the
+        function vectors, so these must not alias the Newton iterate
+        """
+        uvecs = [usub.vector().vec().copy() for usub in self.u["u"]._functions]
+        if len(self.problem.global_sizes) == 1:
+            self._ubackend = uvecs[0]
+        else:
+            self._ubackend = PETSc.Vec().createNest(uvecs)
 
     def get_global_sizes(self, u):
         return [uj.function_space().dim() for uj in u]
@@ -1296,73 +1449,17 @@ class Model:
             Fblock = Ftemp
 
         assert len(Fblock) == len(u)
-        # Decompose F blocks into subforms based on domain of integration
-        # Fblock = [F0, F1, ... , Fn] where the index is the compartment index
-        # Flist  = [[F0(Omega_0), F0(Omega_1)], ..., [Fn(Omega_n)]]
-        # If a form has integrals on multiple domains, they are split into a list
-        Flist = list()
-        for idx, Fi in enumerate(Fblock):
-            if Fi is None or Fi.empty():
-                fancy_print(
-                    f"F{idx} = F[{self.cc.get_index(idx).name}]) is empty",
-                    format_type="warning",
-                )
-                Flist.append([d.cpp.fem.Form(1, 0)])
-            else:
-                Fs = []
-                for Fsub in sub_forms_by_domain(Fi):
-                    if Fsub is None or Fsub.empty():
-                        domain = self.get_mesh_by_id(Fsub.mesh().id()).name
-                        fancy_print(
-                            f"F{idx} = F[{self.cc.get_index(idx).name}] is empty "
-                            f"on integration domain {domain}",
-                            format_type="logred",
-                        )
-                        Fs.append(d.cpp.fem.Form(1, 0))
-                    else:
-                        Fs.append(d.Form(Fsub))
-                Flist.append(Fs)
-        # fancy_print("[problem] create list of residual forms OK", format_type='log')
-        return Flist
+        return self._split_block_F(Fblock)
 
     def get_block_J(self, Fsum, u):
         # blocks/partitions are by compartment, not species
         Fblock = d.extract_blocks(Fsum)
-        J = []
-        for Fi in Fblock:
-            for uj in u:
-                dFdu = expand_derivatives(d.derivative(Fi, uj))
-                J.append(dFdu)
+        J = self._differentiate_blocks(Fblock, u)
 
         # Check number of blocks in the residual and solution are coherent
         assert len(J) == len(u) * len(u)
 
-        # Decompose J blocks into subforms based on domain of integration
-        Jlist = list()
-        for idx, Ji in enumerate(J):
-            idx_i, idx_j = divmod(idx, len(u))
-            if Ji is None or Ji.empty():
-                fancy_print(
-                    f"J{idx_i}{idx_j} = dF[{self.cc.get_index(idx_i).name}])"
-                    f"/du[{self.cc.get_index(idx_j).name}] is empty",
-                    format_type="logred",
-                )
-                Jlist.append([d.cpp.fem.Form(2, 0)])
-            else:
-                Js = []
-                for Jsub in sub_forms_by_domain(Ji):
-                    if Jsub is None or Jsub.empty():
-                        domain = self.get_mesh_by_id(Jsub.mesh().id()).name
-                        fancy_print(
-                            f"J{idx_i}{idx_j} = dF[{self.cc.get_index(idx_i).name}])"
-                            f"/du[{self.cc.get_index(idx_j).name}]"
-                            f"is empty on integration domain {domain}",
-                            format_type="logred",
-                        )
-                    Js.append(d.Form(Jsub))
-                Jlist.append(Js)
-
-        return Jlist
+        return self._split_block_J(J, len(u))
 
     # ===============================================================================
     # Model - Solving
@@ -1530,8 +1627,10 @@ class Model:
             self.dt = round(self.dt, self.config.solver["time_precision"])
         self.tn = self.rounded_decimal(self.t)  # save the previous time
         self.t = self.rounded_decimal(self.t + self.dt)
-        self.dT.assign(self.dt)
-        self.T.assign(self.t)
+        # self.dt/self.t are Decimals, convert once and assign directly to the
+        # underlying C++ Constants (skips the type dispatch in Constant.assign)
+        self.dT._cpp_object.assign(float(self.dt))
+        self.T._cpp_object.assign(float(self.t))
 
         self.tvec.append(self.t)
         self.dtvec.append(self.dt)
@@ -1568,6 +1667,9 @@ class Model:
 
             # Solve
             self.solver.solve(None, self._ubackend)
+            # the last residual evaluation may have been at a trial vector, make sure
+            # the functions hold the accepted iterate
+            self.problem.copy_u(self._ubackend)
 
             # Store/compute timings
             fancy_print(
@@ -1625,27 +1727,18 @@ class Model:
                 for idx in range(self.num_active_compartments):
                     curSub = self.u["u"].sub(idx)
                     curVec = curSub.vector()
-                    if any(
-                        curVec < -1e-6
-                    ):  # if value is "too negative", we reduce time step and recompute
+                    # if value is "too negative", we reduce time step and recompute
+                    # (single reduction over the vector rather than a Python-level any())
+                    if curVec.min() < -1e-6:
                         negVals = True
                         break
                 if negVals:
                     self.reset_timestep()
                     # Re-initialize SNES solver
-                    if len(self.problem.global_sizes) == 1:
-                        self._ubackend = self.u["u"]._functions[0].vector().vec().copy()
-                    else:
-                        self._ubackend = PETSc.Vec().createNest(
-                            [
-                                usub.vector().vec().copy()
-                                for usub in self.u["u"]._functions
-                            ]
-                        )
+                    self._set_ubackend()
                     # need to re-link global function with species-specific functions
                     # after re-setting previous solution
-                    self._init_4_4_get_species_u_v_V_dofmaps()
-                    self._init_4_5_name_functions()
+                    self._init_4_4_setup_compartment_functions(check_validity=False)
                     self._failed_to_converge = True
                     self.monolithic_solve()
                     return
@@ -1676,16 +1769,10 @@ class Model:
                 )
                 self.reset_timestep()
                 # Re-initialize SNES solver
-                if len(self.problem.global_sizes) == 1:
-                    self._ubackend = self.u["u"]._functions[0].vector().vec().copy()
-                else:
-                    self._ubackend = PETSc.Vec().createNest(
-                        [usub.vector().vec().copy() for usub in self.u["u"]._functions]
-                    )
+                self._set_ubackend()
                 # need to re-link global function with species-specific functions
                 # after re-setting previous solution
-                self._init_4_4_get_species_u_v_V_dofmaps()
-                self._init_4_5_name_functions()
+                self._init_4_4_setup_compartment_functions(check_validity=False)
                 self._failed_to_converge = True
                 self.monolithic_solve()
                 return
@@ -1698,14 +1785,17 @@ class Model:
             )
             self.solver.solve()
 
+            # assemble each compartment residual once, the total (l2) residual
+            # follows from the compartment norms
+            residuals = {
+                compartment.name: self.get_compartment_residual(compartment, norm=2)
+                for compartment in self._active_compartments
+            }
             fancy_print(
-                f"Total residual: {self.get_total_residual(norm=2)}", format_type="log"
+                f"Total residual: {np.linalg.norm(list(residuals.values()))}",
+                format_type="log",
             )
-            residuals = dict()
             for compartment in self._active_compartments:
-                residuals[compartment.name] = self.get_compartment_residual(
-                    compartment, norm=2
-                )
                 fancy_print(
                     f"L2-norm of compartment {compartment.name} is {residuals[compartment.name]}",
                     format_type="log",
@@ -1787,18 +1877,15 @@ class Model:
         tn = float(self.tn)
 
         # Update time dependent parameters
-        for parameter_name, parameter in self.pc.items:
+        for parameter in self._time_dependent_parameters:
+            parameter_name = parameter.name
             new_value = None
-            if not parameter.is_time_dependent:
-                continue
             if not parameter.use_preintegration:
                 # Parameters that are defined as dolfin expressions will
                 # automatically be updated by model.T.assign(t)
                 if parameter.type == "expression":
-                    parameter.value = parameter.sym_expr.subs({"t": t}).evalf()
-                    parameter.value_vector = np.vstack(
-                        (parameter.value_vector, [t, parameter.value])
-                    )
+                    parameter.value = float(parameter.sym_expr_lambda(t))
+                    parameter._value_history.append([t, parameter.value])
                     continue
                 # Parameters from a data file need to have their dolfin constant updated
                 if parameter.type == "from_file":
@@ -1815,27 +1902,35 @@ class Model:
                     )
                     fancy_print(
                         f"Time-dependent parameter {parameter_name} updated by data. "
-                        "New value is {new_value}",
+                        f"New value is {new_value}",
                         format_type="log",
                     )
 
             if parameter.use_preintegration:
                 if parameter.type == "expression":
-                    a = parameter.preint_sym_expr.subs({"t": tn}).evalf()
-                    b = parameter.preint_sym_expr.subs({"t": t}).evalf()
+                    # The anti-derivative at tn was already evaluated in the previous
+                    # time-step (unless the time-step was reset)
+                    tprev, bprev = parameter.preint_value_prev
+                    if tprev == tn:
+                        a = bprev
+                    else:
+                        a = parameter.preint_sym_expr_lambda(tn)
+                    b = parameter.preint_sym_expr_lambda(t)
+                    parameter.preint_value_prev = (t, b)
                     new_value = float((b - a) / dt)
                     fancy_print(
                         f"Time-dependent parameter {parameter_name} updated by "
-                        "pre-integrated expression. New value is {new_value}",
+                        f"pre-integrated expression. New value is {new_value}",
                         format_type="log",
                     )
                 if parameter.type == "from_file":
                     int_data = parameter.preint_sampling_data
-                    a = np.interp(
-                        tn, int_data[:, 0], int_data[:, 1], left=np.nan, right=np.nan
-                    )
-                    b = np.interp(
-                        t, int_data[:, 0], int_data[:, 1], left=np.nan, right=np.nan
+                    a, b = np.interp(
+                        [tn, t],
+                        int_data[:, 0],
+                        int_data[:, 1],
+                        left=np.nan,
+                        right=np.nan,
                     )
                     new_value = float((b - a) / dt)
                     fancy_print(
@@ -1846,9 +1941,7 @@ class Model:
 
             if new_value is not None:
                 assert not np.isnan(new_value)
-                parameter.value_vector = np.vstack(
-                    (parameter.value_vector, [t, new_value])
-                )
+                parameter._value_history.append([t, new_value])
                 parameter.value = new_value
                 parameter.dolfin_constant.assign(new_value)
             else:
@@ -1861,14 +1954,18 @@ class Model:
         the solutions for the previous time step.
         """
         if ukeys is None:
-            ukeys = set(self.u.keys()).remove(unew)
+            ukeys = set(self.u.keys()) - {unew}
 
+        unew_vecs = [usub.vector().vec() for usub in self.u[unew]._functions]
         for ukey in ukeys:
             if ukey not in self.u.keys():
                 raise ValueError(f"Key {ukey} is not in model.u.keys()")
-            # for a function from a mixed function space
-            for idx in range(self.num_active_compartments):
-                self.u[ukey].sub(idx).assign(self.u[unew].sub(idx))
+            # for a function from a mixed function space copy each sub function
+            # vector directly. Copying the local forms copies the owned and ghost
+            # values in one VecCopy so no ghost update is needed afterwards
+            for unew_vec, usub in zip(unew_vecs, self.u[ukey]._functions):
+                with unew_vec.localForm() as src, usub.vector().vec().localForm() as dst:
+                    src.copy(dst)
 
     # ===============================================================================
     # Model - Post-processing
@@ -1899,15 +1996,23 @@ class Model:
             return species.dof_map
         species_idx = species.dof_index
 
-        V = sub(species.compartment.V, species_idx, collapse_function_space=False)
+        # the (collapsed) species.V has its own dof numbering so we need the
+        # uncollapsed sub space to get indices into the compartment vector.
+        # dofs() and ownership_range() are both process-local (no communication)
+        dofmap = sub(
+            species.compartment.V, species_idx, collapse_function_space=False
+        ).dofmap()
 
-        indices = np.array(V.dofmap().dofs())
+        indices = np.asarray(dofmap.dofs())
         # indices that this CPU owns
-        first_idx, _ = V.dofmap().ownership_range()
-
-        return (
-            indices - first_idx
-        )  # subtract index offset to go from global -> local indices
+        first_idx, _ = dofmap.ownership_range()
+        # subtract index offset to go from global -> local indices
+        # (the offset is always zero in serial)
+        if first_idx != 0:
+            indices -= first_idx
+        # cache so later calls are O(1) (dof counts are local so int32 suffices)
+        species.dof_map = indices.astype(np.int32, copy=False)
+        return species.dof_map
 
     def dolfin_set_function_values(self, sp, ukey, unew):
         """
@@ -1918,8 +2023,21 @@ class Model:
             uinterp = d.interpolate(unew, sp.V)
             d.assign(sp.u[ukey], uinterp)
         elif isinstance(unew, (float, int)):
-            uinterp = d.interpolate(d.Constant(unew), sp.V)
-            d.assign(sp.u[ukey], uinterp)
+            # interpolating a constant into a Lagrange space sets every dof to that
+            # value so we can write it directly to the species entries
+            uvec = self.cc[sp.compartment_name].u[ukey].vector()
+            d.as_backend_type(uvec).vec().array[sp.dof_map] = unew
+            uvec.apply("insert")
+        elif isinstance(unew, FunctionType):
+            # unew is a numpy-vectorized function of the coordinates (x, y, z)
+            u = self.cc[sp.compartment_name].u[ukey]
+            uvec = u.vector()
+            # write only this species' entries through a view of the local array
+            # rather than copying the whole vector out and back in
+            d.as_backend_type(uvec).vec().array[
+                sp.dof_map
+            ] = self.dolfin_eval_at_dof_coordinates(sp, unew)
+            uvec.apply("insert")
         elif len(unew) > 1:
             if len(sp.dof_map) == len(unew):
                 # unew is an N x 4 array: [X, Y, Z, function_values]
@@ -1931,49 +2049,67 @@ class Model:
                 function_values = unew[:, 3]
                 # nearest neighbor interpolation
                 # (in this case, matching up exactly with mesh points)
-                dof_vals_cur = np.zeros((len(mesh_coord),))
-                for i in range(len(dof_coord)):
-                    dist_vec = np.sum((dof_coord[i, :] - mesh_coord) ** 2, axis=1)
-                    dof_vals_cur[i] = function_values[np.argmin(dist_vec)]
-                    if i % 1000 == 0:
-                        fancy_print(
-                            f"Set {i} of {len(dof_coord)} function values for {sp.name}"
-                        )
+                _, nearest = cKDTree(mesh_coord).query(dof_coord)
+                dof_vals_cur = function_values[nearest]
+                fancy_print(f"Set {len(dof_coord)} function values for {sp.name}")
                 # indices = self.dolfin_get_dof_indices(sp)
                 indices = sp.dof_map
                 uvec = u.vector()
-                values = uvec.get_local()
-                values[indices] = dof_vals_cur
-                uvec.set_local(values)
+                d.as_backend_type(uvec).vec().array[indices] = dof_vals_cur
                 uvec.apply("insert")
         elif isinstance(unew, d.Function):
             fancy_print(f"Function already set for {sp.name}")
         else:
             raise NotImplementedError
 
+    @staticmethod
+    def dolfin_eval_at_dof_coordinates(sp, func):
+        """
+        Evaluate a numpy-vectorized function of the coordinates, func(x, y, z),
+        at the (local) dof coordinates of species sp
+        """
+        compartment = sp.compartment
+        # tabulating the dof coordinates walks the whole dofmap, do it once per
+        # function space and reuse it for every species in the compartment
+        if compartment.dof_coordinates is None:
+            compartment.dof_coordinates = compartment.V.tabulate_dof_coordinates()
+        dof_coord = compartment.dof_coordinates[sp.dof_map]
+        coords = np.zeros((len(sp.dof_map), 3))
+        coords[:, : dof_coord.shape[1]] = dof_coord
+        return np.broadcast_to(func(*coords.T), (len(sp.dof_map),))
+
     @property
     def num_active_compartments(self):
         return len(self._active_compartments)
 
     def get_compartment_residual(self, compartment, norm=None):
-        res_vec = sum(
-            [
-                d.assemble_mixed(form).get_local()
-                for form in self.Fblocks_all[compartment.dof_index]
-            ]
-        )
+        forms = self.Fblocks_all[compartment.dof_index]
+        if norm in _vector_norm_types:
+            # sum the assembled PETSc vectors and let PETSc compute the norm, this
+            # reduces over all processes without copying to numpy
+            res = d.assemble_mixed(forms[0])
+            for form in forms[1:]:
+                res += d.assemble_mixed(form)
+            return res.norm(_vector_norm_types[norm])
+        # accumulate in place (sum() would allocate a new array for every form)
+        res_vec = d.assemble_mixed(forms[0]).get_local()
+        for form in forms[1:]:
+            res_vec += d.assemble_mixed(form).get_local()
         if norm is None:
             return res_vec
         else:
             return np.linalg.norm(res_vec, norm)
 
     def get_total_residual(self, norm=None):
-        res_vec = np.hstack(
-            [
-                d.assemble_mixed(form).get_local()
-                for form in chain.from_iterable(self.Fblocks_all)
-            ]
-        )
+        if norm in _vector_norm_types:
+            # these norms reduce over the compartment norms, no need to concatenate
+            return np.linalg.norm(
+                [
+                    self.get_compartment_residual(compartment, norm=norm)
+                    for compartment in self._active_compartments
+                ],
+                norm,
+            )
         res_vec = np.hstack(
             [
                 self.get_compartment_residual(compartment, norm=None)
@@ -2006,59 +2142,29 @@ class Model:
                 "num_facets",
                 "num_vertices",
             ]
-            df = pandas.DataFrame()
-
-            # parent mesh
-            tempdict = odict()
-            for key in properties_to_print:
-                tempdict[key] = getattr(self.parent_mesh, key)
-
-            tempseries = pandas.Series(tempdict, name=self.parent_mesh.name)
-            df = pandas.concat([df, tempseries.to_frame().T], ignore_index=True)
-            # child meshes
-            for child_mesh in self.child_meshes.values():
-                tempdict = odict()
+            # collect the table column by column and build it once at the end
+            columns = {key: [] for key in properties_to_print}
+
+            # parent mesh and child meshes
+            for mesh in [self.parent_mesh, *self.child_meshes.values()]:
                 for key in properties_to_print:
-                    tempdict[key] = getattr(child_mesh, key)
-                tempseries = pandas.Series(tempdict, name=child_mesh.name)
-                df = pandas.concat([df, tempseries.to_frame().T], ignore_index=True)
+                    columns[key].append(getattr(mesh, key))
             # intersection meshes
             for child_mesh in self.parent_mesh.child_surface_meshes:
                 for mesh_id_pair in child_mesh.intersection_map.keys():
-                    tempdict = odict()
-                    if len(mesh_id_pair) == 1:
-                        mesh_str = self.parent_mesh.get_mesh_from_id(
-                            list(mesh_id_pair)[0]
-                        ).name
-                    else:
-                        mesh_str = (
-                            self.parent_mesh.get_mesh_from_id(
-                                list(mesh_id_pair)[0]
-                            ).name
-                            + "_"
-                            + self.parent_mesh.get_mesh_from_id(
-                                list(mesh_id_pair)[1]
-                            ).name
-                        )
-
-                    intersection_mesh_name = f"{child_mesh.name}_intersect_{mesh_str}"
-                    tempdict["name"] = intersection_mesh_name
-                    tempdict["id"] = int(
-                        child_mesh.intersection_submesh[mesh_id_pair].id()
+                    mesh_str = "_".join(
+                        self.parent_mesh.get_mesh_from_id(mesh_id).name
+                        for mesh_id in list(mesh_id_pair)[:2]
                     )
-                    tempdict["dimensionality"] = child_mesh.dimensionality
-                    tempdict["num_cells"] = child_mesh.intersection_submesh[
-                        mesh_id_pair
-                    ].num_cells()
-                    tempdict["num_facets"] = child_mesh.intersection_submesh[
-                        mesh_id_pair
-                    ].num_facets()
-                    tempdict["num_vertices"] = child_mesh.intersection_submesh[
-                        mesh_id_pair
-                    ].num_vertices()
-                    tempseries = pandas.Series(tempdict, name=intersection_mesh_name)
-                    df = pandas.concat([df, tempseries.to_frame().T], ignore_index=True)
-
+                    intersection_submesh = child_mesh.intersection_submesh[mesh_id_pair]
+                    columns["name"].append(f"{child_mesh.name}_intersect_{mesh_str}")
+                    columns["id"].append(int(intersection_submesh.id()))
+                    columns["dimensionality"].append(child_mesh.dimensionality)
+                    columns["num_cells"].append(intersection_submesh.num_cells())
+                    columns["num_facets"].append(intersection_submesh.num_facets())
+                    columns["num_vertices"].append(intersection_submesh.num_vertices())
+
+            df = pandas.DataFrame(columns)
             print(tabulate(df, headers="keys", tablefmt=tablefmt))
 
     def rounded_decimal(self, x):
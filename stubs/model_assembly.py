@@ -5,8 +5,8 @@ Model class contains functions to efficiently solve a system
 import dataclasses
 import numbers
 import sys
-from collections import OrderedDict as odict
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from pprint import pprint
 from textwrap import wrap
 from typing import Any, Union
@@ -19,7 +19,6 @@ import petsc4py.PETSc as PETSc
 import pint
 import sympy as sym
 import ufl
-from cached_property import cached_property
 from sympy import Symbol, integrate
 from sympy.parsing.sympy_parser import parse_expr
 from tabulate import tabulate
@@ -48,6 +47,15 @@ size = comm.size
 root = 0
 
 
+@lru_cache(maxsize=None)
+def _parse_expr_cached(expr_str: str):
+    """
+    parse_expr for equation templates shared by many reactions
+    (sympy expressions are immutable, so the parsed template can be shared)
+    """
+    return parse_expr(expr_str)
+
+
 def _np_smart_hstack(
     x1: Union[list, npt.ArrayLike], x2: Union[list, npt.ArrayLike]
 ) -> npt.ArrayLike:
@@ -72,11 +80,7 @@ def _np_smart_hstack(
             _np_smart_hstack(a_list, a_np_array)
     """
     assert len(x1) == len(x2)  # confirm same size
-    if isinstance(x1, list):
-        x1 = np.array(x1)
-    if isinstance(x2, list):
-        x2 = np.array(x2)
-    return np.hstack([x1.reshape(-1, 1), x2.reshape(-1, 1)])
+    return np.column_stack([x1, x2])
 
 
 # ====================================================
@@ -92,7 +96,7 @@ class ObjectContainer:
     """
 
     def __init__(self, ObjectClass):  # df=None, Dict=None):
-        self.Dict = odict()
+        self.Dict = dict()
         self._ObjectClass = ObjectClass
         self.properties_to_print = []  # properties to print
 
@@ -370,15 +374,11 @@ class ObjectInstance:
 
     def get_pandas_series(self, properties_to_print=None, idx=None):
         if properties_to_print:
-            dict_to_convert = odict({"idx": idx})
+            dict_to_convert = {"idx": idx}
             dict_to_convert.update(
-                odict(
-                    [
-                        (key, val)
-                        for (key, val) in self.__dict__.items()
-                        if key in properties_to_print
-                    ]
-                )
+                (key, val)
+                for (key, val) in self.__dict__.items()
+                if key in properties_to_print
             )
         else:
             dict_to_convert = self.__dict__
@@ -566,6 +566,23 @@ class Parameter(ObjectInstance):
         if not hasattr(self, "type"):
             self.type = "constant"
 
+        # Compile the (pre-integrated) expression once so that time-stepping does not
+        # need to go through sympy's subs()/evalf() at every step
+        if self.sym_expr is not None and self.is_time_dependent:
+            self.sym_expr_lambda = sym.lambdify(
+                Symbol("t"), self.sym_expr, modules="numpy"
+            )
+        else:
+            self.sym_expr_lambda = None
+        if self.preint_sym_expr is not None:
+            self.preint_sym_expr_lambda = sym.lambdify(
+                Symbol("t"), self.preint_sym_expr, modules="numpy"
+            )
+        else:
+            self.preint_sym_expr_lambda = None
+        # (t, value) of the last evaluation of the pre-integrated expression
+        self.preint_value_prev = (None, None)
+
         self._convert_pint_quantity_to_unit()
         self._check_input_type_validity()
         self._convert_pint_unit_to_quantity()
@@ -573,7 +590,13 @@ class Parameter(ObjectInstance):
 
         # self.dolfin_constant = d.Constant(self.value)
         # self.value_unit = self.value*self.unit
-        self.value_vector = np.array([0, self.value])
+        # (t, value) history, appended to at every time-step
+        self._value_history = [[0, self.value]]
+
+    @property
+    def value_vector(self):
+        "Array of (t, value) pairs for every time this parameter was updated"
+        return np.array(self._value_history)
 
     @property
     def dolfin_quantity(self):
@@ -700,11 +723,13 @@ class Species(ObjectInstance):
             if not {"x[0]", "x[1]", "x[2]"}.issuperset(free_symbols):
                 raise NotImplementedError
             fancy_print(
-                f"Creating dolfin object for space-dependent initial condition {self.name}",
+                f"Creating numpy function for space-dependent initial condition {self.name}",
                 format_type="log",
             )
-            self.initial_condition_expression = d.Expression(
-                sym.printing.ccode(sym_expr), degree=1
+            # Evaluated directly on the dof coordinates (vectorized) rather than
+            # compiling a dolfin.Expression and interpolating it
+            self.initial_condition_expression = sym.lambdify(
+                [x, y, z], sym_expr, modules="numpy"
             )
         else:
             raise TypeError("initial_condition must be a float or string.")
@@ -825,11 +850,12 @@ class Compartment(ObjectInstance):
         self.check_validity()
 
         # Initialize
-        self.species = odict()
+        self.species = dict()
         self.u = dict()
         self._usplit = dict()
         self.V = None
         self.v = None
+        self.dof_coordinates = None
 
     def check_validity(self):
         if self.dimensionality not in [1, 2, 3]:
@@ -970,6 +996,9 @@ class Reaction(ObjectInstance):
         self._check_input_type_validity()
         self.check_validity()
         self.fluxes = dict()
+        # sympy expressions of eqn_f_str/eqn_r_str (set during model initialization)
+        self.eqn_f = None
+        self.eqn_r = None
 
         if (
             self.eqn_f_str != ""
@@ -1027,12 +1056,13 @@ class Reaction(ObjectInstance):
                 )
 
     def _parse_custom_reaction(self, reaction_eqn_str):
-        reaction_expr = parse_expr(reaction_eqn_str)
+        "Substitute parameter/species names into a reaction equation (sympy expression)"
+        reaction_expr = _parse_expr_cached(reaction_eqn_str)
         reaction_expr = reaction_expr.subs(self.param_map)
         # # use species_scaling if available
         # reaction_expr = reaction_expr.subs(self._species_scaling_map)
         reaction_expr = reaction_expr.subs(self.species_map)
-        return str(reaction_expr)
+        return reaction_expr
 
     def reaction_to_fluxes(self):
         fancy_print(f"Getting fluxes for reaction {self.name}", format_type="log")
@@ -1059,15 +1089,23 @@ class Reaction(ObjectInstance):
                 )
                 self.species_stoich[species_name] *= self.flux_scaling[species_name]
 
+        # parse the rate laws once (if not already done during model
+        # initialization) and reuse them for every species
+        eqn_f = self.eqn_f
+        if eqn_f is None and self.eqn_f_str:
+            eqn_f = parse_expr(self.eqn_f_str)
+        eqn_r = self.eqn_r
+        if eqn_r is None and self.eqn_r_str:
+            eqn_r = parse_expr(self.eqn_r_str)
         for species_name, stoich in self.species_stoich.items():
             species = self.species[species_name]
-            if self.eqn_f_str:
+            if eqn_f is not None:
                 flux_name = self.name + f" [{species_name} (f)]"
-                eqn = stoich * parse_expr(self.eqn_f_str)
+                eqn = stoich * eqn_f
                 self.fluxes.update({flux_name: Flux(flux_name, species, eqn, self)})
-            if self.eqn_r_str:
+            if eqn_r is not None:
                 flux_name = self.name + f" [{species_name} (r)]"
-                eqn = -stoich * parse_expr(self.eqn_r_str)
+                eqn = -stoich * eqn_r
                 self.fluxes.update({flux_name: Flux(flux_name, species, eqn, self)})
 
 
@@ -1378,18 +1416,16 @@ class Flux(ObjectInstance):
     def assembled_flux(self):
         """Same thing as molecules_per_second but doesn't try to convert
         units (e.g. volumetric concentration is being used on a 2d domain)"""
+        # assemble once, only the unit conversion can fail
+        assembled_flux = (
+            d.assemble(self.scalar_form).sum()
+            * self.equation_units
+            * self.measure_units
+        )
         try:
-            self._assembled_flux = -1 * (
-                d.assemble(self.scalar_form).sum()
-                * self.equation_units
-                * self.measure_units
-            ).to(unit.molecule / unit.s)
+            self._assembled_flux = -1 * assembled_flux.to(unit.molecule / unit.s)
         except Exception:
-            self._assembled_flux = -1 * (
-                d.assemble(self.scalar_form).sum()
-                * self.equation_units
-                * self.measure_units
-            )
+            self._assembled_flux = -1 * assembled_flux
         return self._assembled_flux
 
     def _post_init_get_is_linear_comp(self):
@@ -1518,4 +1554,10 @@ def sbmodel_from_locals(local_values):
 
 
 def nan_to_none(df):
-    return df.replace({np.nan: None})
+    # boolean mask instead of replace(), which goes through the per-element
+    # object replace machinery. Only columns that contain NaN become object
+    # dtype, the others keep their numpy dtype
+    df = df.copy()
+    for col in df.columns[df.isna().any()]:
+        df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
@@ -1,10 +1,20 @@
 # # Using PETSc to solve monolithic problem
 import dolfin as d
-import os
 import petsc4py.PETSc as p
 from .common import _fancy_print as fancy_print
 
 
+def get_form_constants(form):
+    """Return the dolfin Constants a UFL form depends on, or None if the form
+    depends on any other coefficient (e.g. the solution). A form that only
+    depends on Constants gives the same assembled tensor as long as the values
+    of those Constants do not change."""
+    coefficients = form.coefficients()
+    if all(isinstance(c, d.Constant) for c in coefficients):
+        return tuple(coefficients)
+    return None
+
+
 class stubsSNESProblem:
     """To interface with PETSc SNES solver
 
@@ -95,10 +105,23 @@ class stubsSNESProblem:
         stopwatches,
         print_assembly,
         mpi_comm_world,
+        Jforms_constants=None,
     ):
         self.u = u
         self.Fforms = Fforms
         self.Jforms_all = Jforms_all
+        # Jforms_constants[ij][k] is a tuple of the Constants that Jforms_all[ij][k]
+        # depends on (None if it depends on anything else). Those subforms are only
+        # re-assembled when the values of their Constants change (e.g. dt).
+        if Jforms_constants is None:
+            Jforms_constants = [[None] * len(Jij_list) for Jij_list in Jforms_all]
+        self.Jforms_constants = Jforms_constants
+        self.Jforms_constant_values = [
+            [None] * len(Jij_list) for Jij_list in Jforms_all
+        ]
+        # Copies of the assembled tensors (the working tensors may also be blocks of
+        # the nest matrix, which is zeroed before every assembly)
+        self.Jforms_cached_tensors = [[None] * len(Jij_list) for Jij_list in Jforms_all]
 
         # for convenience, the mixed function space (model.V)
         self.W = [usub.function_space() for usub in u._functions]
@@ -111,6 +134,8 @@ class stubsSNESProblem:
 
         # save sparsity patterns of block matrices
         self.tensors = [[None] * len(Jij_list) for Jij_list in self.Jforms_all]
+        # and the residual vectors
+        self.Ftensors = [[None] * len(Fj_list) for Fj_list in self.Fforms]
 
         # Get local_to_global maps (len=number of owned dofs + ghost dofs) and
         # dofs (len=number of owned dofs)
@@ -155,7 +180,7 @@ class stubsSNESProblem:
         # init_global_tensor() is commented out
         # Thanks to Prof. Kamensky and his student for the idea
         # https://github.com/hanzhao2020/PENGoLINS/blob/main/PENGoLINS/cpp/transfer_matrix.cpp
-        os.path.dirname(os.path.realpath(__file__))
+        # path_to_script_dir = os.path.dirname(os.path.realpath(__file__))
         # cpp_file = open(path_to_script_dir+"/cpp/MixedAssemblerTemp.cpp","r")
         # cpp_code = cpp_file.read()
         # cpp_file.close()
@@ -225,8 +250,9 @@ class stubsSNESProblem:
                             f"and global size {self.global_sizes[i]}, {self.global_sizes[j]}",
                             format_type="log",
                         )
+                    # (structurally zero so don't preallocate any non-zeros)
                     self.tensors[ij][0] = d.PETScMatrix(
-                        self.init_petsc_matrix(i, j, assemble=True)
+                        self.init_petsc_matrix(i, j, nnz_guess=0, assemble=True)
                     )
                     Jpetsc.append(self.tensors[ij][0])
                 elif non_empty_forms == 1:
@@ -264,6 +290,13 @@ class stubsSNESProblem:
         self.Jpetsc_nest.assemble()
         print(f"Jpetsc_nest assembled, size = {self.Jpetsc_nest.size}")
 
+    def get_constant_values(self, ij, k):
+        "Current values of the Constants Jforms_all[ij][k] depends on (if cacheable)"
+        constants = self.Jforms_constants[ij][k]
+        if constants is None:
+            return None
+        return tuple(tuple(c.values()) for c in constants)
+
     def d_to_p(self, dolfin_matrix):
         return d.as_backend_type(dolfin_matrix).mat()
 
@@ -362,6 +395,22 @@ class stubsSNESProblem:
                             )
                         continue
 
+                    # Subforms that only depend on Constants don't need to be re-assembled
+                    # unless the Constant values changed
+                    constant_values = self.get_constant_values(ij, k)
+                    if (
+                        constant_values is not None
+                        and constant_values == self.Jforms_constant_values[ij][k]
+                    ):
+                        if self.print_assembly:
+                            fancy_print(
+                                f"{self.Jijk_name(i,j,k)} is unchanged. Reusing "
+                                "assembled tensor.",
+                                format_type="data",
+                            )
+                        Jmats.append(self.Jforms_cached_tensors[ij][k])
+                        continue
+
                     # if we have the sparsity pattern re-use it, if not save it for next time
                     # single domain can't re-use the tensor for some reason
                     if self.tensors[ij][k] is None and not self.is_single_domain:
@@ -374,10 +423,17 @@ class stubsSNESProblem:
                                 f"Reusing tensor for {self.Jijk_name(i,j,k)}",
                                 format_type="data",
                             )
+                    # Blocks with a single subform use the tensor itself as the nest
+                    # block (see init_petsc_matnest). Assembling into it already sets
+                    # the block, adding it to itself would double it
+                    is_nest_block = self.tensors[ij][k].mat().handle == Jij_petsc.handle
                     # Assemble and append to the list of subforms
-                    Jmats.append(
-                        d.assemble_mixed(Jform[ij][k], tensor=self.tensors[ij][k])
-                    )
+                    Jmat = d.assemble_mixed(Jform[ij][k], tensor=self.tensors[ij][k])
+                    if not is_nest_block:
+                        Jmats.append(Jmat)
+                    if constant_values is not None:
+                        self.Jforms_cached_tensors[ij][k] = self.tensors[ij][k].copy()
+                        self.Jforms_constant_values[ij][k] = constant_values
                     # Print some useful info on assembled Jijk
                     self.print_Jijk_info(i, j, k, tensor=self.tensors[ij][k].mat())
 
@@ -407,18 +463,21 @@ class stubsSNESProblem:
             Fj_petsc = [Fnest]
         else:
             Fj_petsc = Fnest.getNestSubVecs()
-        Fvecs = []
 
         for j in range(dim):
-            Fvecs.append([])
-            for k in range(len(self.Fforms[j])):
-                # , tensor=d.PETScVector(Fvecs[idx]))
-                Fvecs[j].append(d.as_backend_type(d.assemble_mixed(self.Fforms[j][k])))
-            # TODO: could probably speed this up by not using axpy if there is only one subform
-            # sum the vectors
-            Fj_petsc[j].zeroEntries()
-            for k in range(len(self.Fforms[j])):
-                Fj_petsc[j].axpy(1, Fvecs[j][k].vec())
+            num_subforms = len(self.Fforms[j])
+            for k in range(num_subforms):
+                # re-use the vectors from the previous assembly
+                if self.Ftensors[j][k] is None:
+                    self.Ftensors[j][k] = d.PETScVector(self.comm)
+                d.assemble_mixed(self.Fforms[j][k], tensor=self.Ftensors[j][k])
+            # sum the vectors (a single subform can just be copied)
+            if num_subforms == 1:
+                self.Ftensors[j][0].vec().copy(Fj_petsc[j])
+            else:
+                Fj_petsc[j].zeroEntries()
+                for k in range(num_subforms):
+                    Fj_petsc[j].axpy(1, self.Ftensors[j][k].vec())
 
         Fnest.assemble()
         self.stopwatches["snes residual assemble"].pause()
@@ -429,9 +488,17 @@ class stubsSNESProblem:
         else:
             uvecs = unest.getNestSubVecs()
 
-        for idx, uvec in enumerate(uvecs):
-            uvec.copy(self.u.sub(idx).vector().vec())
-            self.u.sub(idx).vector().apply("")
+        usub_vecs = [self.u.sub(idx).vector().vec() for idx in range(len(uvecs))]
+        for uvec, usub_vec in zip(uvecs, usub_vecs):
+            uvec.copy(usub_vec)
+        # Only owned values are set above so we just need to update the ghost values
+        # (what apply("") would do after a no-op VecAssembly). Start all the ghost
+        # updates before finishing any so the scatters of the different
+        # compartments overlap
+        for usub_vec in usub_vecs:
+            usub_vec.ghostUpdateBegin(p.InsertMode.INSERT, p.ScatterMode.FORWARD)
+        for usub_vec in usub_vecs:
+            usub_vec.ghostUpdateEnd(p.InsertMode.INSERT, p.ScatterMode.FORWARD)
 
     def F(self, snes, u, Fnest):
         self.copy_u(u)
@@ -460,8 +527,9 @@ class stubsSNESProblem:
                 (self.local_sizes[j], self.global_sizes[j]),
             )
         )
-        # M.setBlockSizes(self.block_sizes[i], self.block_sizes[j])
-        # M.setBlockSizes(1,1) # seems to be ok with block size 1?
+        # dolfin numbers the dofs of a VectorFunctionSpace species-by-species at each
+        # vertex, so keep the same block structure as the assembled blocks
+        M.setBlockSizes(self.block_sizes[i], self.block_sizes[j])
         M.setType("aij")  # "baij"
 
         if nnz_guess is not None:
@@ -3,6 +3,7 @@
 # ====================================================
 
 import os
+from io import StringIO
 
 from pandas import read_json
 
@@ -33,11 +34,20 @@ def json_to_ObjectContainer(json_str, data_type=None):
             "(parameters, species, compartments, reactions)."
         )
 
-    if json_str[-5:] == ".json":
-        if not os.path.exists(json_str):
-            raise Exception("Cannot find JSON file, %s" % json_str)
+    if os.path.isfile(json_str):
+        json_source = json_str
+    elif json_str[-5:] == ".json":
+        # checked explicitly, the error pandas raises for a missing file
+        # depends on its version
+        raise Exception("Cannot find JSON file, %s" % json_str)
+    else:
+        # wrap literal json so pandas parses it directly instead of first
+        # probing whether the string is a path or url
+        json_source = StringIO(json_str)
 
-    df = read_json(json_str).sort_index()
+    df = read_json(json_source)
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
     df = nan_to_none(df)
     if data_type in ["parameters", "parameter", "param", "p"]:
         return ParameterContainer(df)
@@ -0,0 +1,11 @@
+import stubs
+
+
+def test_stubs_expressions_maps_each_function():
+    expressions = stubs.common.stubs_expressions(
+        {"double": lambda x: 2 * x, "square": lambda x: x**2}
+    )
+    x = 3.0 * stubs.unit.dimensionless
+
+    assert expressions["double"](x) == 6.0
+    assert expressions["square"](x) == 9.0